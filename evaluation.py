@@ -1,15 +1,19 @@
 """Functions for evaluating model outputs."""
 
 
-from typing import List
+from typing import TYPE_CHECKING, Dict, FrozenSet, Iterable, List, Sequence, Tuple
+from functools import lru_cache
+import argparse
 import string
-
-from sklearn.metrics import balanced_accuracy_score
-
-from nltk.stem.porter import *
 import re
 
-import numpy as np
+from matching import find_patterns, greedy_match
+from tasks import TASK_CATEGORIES
+
+# NLTK, NumPy and pandas are imported on first use by the functions that need them,
+# so importing this module (e.g. for the task lists below) stays cheap.
+if TYPE_CHECKING:
+    import pandas as pd
 
 # These tasks are evaluated using exact-match balanced-accuracy
 EXACT_MATCH_BALANCED_ACC_TASKS = [
@@ -173,20 +177,45 @@ EXACT_MATCH_BALANCED_ACC_TASKS = [
 # This task needs to be evaluated by hand.
 MANUAL_EVAL_TASKS = ["rule_qa"]
 
+# Exceptions to successor liability that models are asked to identify.
+SUCCESSOR_LIABILITY_CLASSES = [
+    "express agreement",
+    "fraudulent conveyance",
+    "de facto merger",
+    "mere continuation",
+]
 
-def normalize(text: str, stem: bool) -> str:
-    """
-    Normalizes strings.
 
-    Args:
-        - text: text to normalize
-        - stem: whether or not to apply a stemmer
-    
-    Returns: normalized text
+# Translation table is built once and shared by every call to normalize.
+PUNCTUATION_TABLE = str.maketrans("", "", string.punctuation)
+
+# Used by sara_numeric: generations are joined with NUMBER_SEPARATOR and the first run of
+# digits after each separator is captured, once commas and periods have been removed.
+NUMBER_SEPARATOR = "\x00"
+NUMBER_PUNCTUATION_TABLE = str.maketrans("", "", ",.")
+FIRST_NUMBER_PATTERN = re.compile(r"(?:^|\x00)[^\d\x00]*(\d*)")
+
+# Upper bound on the number of (text, stem) pairs kept by the normalization cache, and
+# on the length of the texts it keeps. Only short strings (labels, answer fragments)
+# repeat often enough to be worth memoizing; caching whole free-form generations would
+# keep every generation of a run in memory.
+NORMALIZE_CACHE_SIZE = 2**16
+NORMALIZE_CACHE_MAX_LENGTH = 64
+
+
+@lru_cache(maxsize=None)
+def get_stemmer():
     """
+    Returns the Porter stemmer shared by every call to normalize, loading NLTK on first use.
+    """
+    from nltk.stem.porter import PorterStemmer
+
+    return PorterStemmer()
 
+
+def _normalize(text: str, stem: bool) -> str:
     # Remove punctuation
-    text = str(text).translate(str.maketrans("", "", string.punctuation))
+    text = text.translate(PUNCTUATION_TABLE)
 
     # Remove extra spaces
     text = text.strip()
@@ -196,10 +225,45 @@ def normalize(text: str, stem: bool) -> str:
 
     # Stem
     if stem:
-        text = PorterStemmer().stem(text)
+        text = get_stemmer().stem(text)
     return text
 
 
+_normalize_cached = lru_cache(maxsize=NORMALIZE_CACHE_SIZE)(_normalize)
+
+
+def normalize(text: str, stem: bool) -> str:
+    """
+    Normalizes strings. Results for short texts are memoized on (text, stem), so
+    repeated labels (e.g. "yes"/"no") are only normalized once.
+
+    Args:
+        - text: text to normalize
+        - stem: whether or not to apply a stemmer
+    
+    Returns: normalized text
+    """
+    text = str(text)
+    if len(text) > NORMALIZE_CACHE_MAX_LENGTH:
+        return _normalize(text, bool(stem))
+    return _normalize_cached(text, bool(stem))
+
+
+def normalize_batch(texts: Iterable[str], stem: bool) -> List[str]:
+    """
+    Normalizes a batch of strings. Duplicate inputs are only normalized once.
+
+    Args:
+        - texts: texts to normalize
+        - stem: whether or not to apply a stemmer
+
+    Returns: list of normalized texts, in the same order as texts
+    """
+    texts = [str(t) for t in texts]
+    normalized: Dict[str, str] = {t: normalize(t, stem) for t in dict.fromkeys(texts)}
+    return [normalized[t] for t in texts]
+
+
 def evaluate(task: str, generations: List[str], answers: List[str]):
     """
     Computes performance metric for task.
@@ -234,36 +298,14 @@ def evaluate_exact_match_balanced_accuracy(generations: List[str], answers: List
     """
     Evaluates exact match using balanced_accuracy.
     """
-    normalized_answers = [normalize(a, stem=False) for a in answers]
-    normalized_gens = [normalize(g, stem=False) for g in generations]
-    return balanced_accuracy_score(normalized_answers, normalized_gens)
+    return BalancedAccuracyAccumulator().update(generations, answers).result()
 
 
 def evaluate_successor_liability(generations: List[str], answers: List[str]):
     """
     For successor liability, we measure F1 over the predicted exceptions.
     """
-    CLASSES = [
-        "express agreement",
-        "fraudulent conveyance",
-        "de facto merger",
-        "mere continuation",
-    ]
-    tp, fp, fn = 0, 0, 0
-    for i in range(len(generations)):
-        predictions = [c for c in CLASSES if c in str(generations[i])]
-        sample_answers = str(answers[i]).split(",")
-
-        for j in range(len(predictions)):
-            if predictions[j] in sample_answers:
-                index = sample_answers.index(predictions[j])
-                del sample_answers[index]
-                tp += 1
-            else:
-                fp += 1
-        fn += len(sample_answers)
-        f1 = 2 * tp / (2 * tp + fp + fn)
-    return f1
+    return SuccessorLiabilityAccumulator().update(generations, answers).result()
 
 
 def evaluate_sara_numeric_acc(generations: List[str], answers: List[str]):
@@ -271,20 +313,7 @@ def evaluate_sara_numeric_acc(generations: List[str], answers: List[str]):
     For sara_numeric, we evaluate the proportion of generations which are within 10%
     of the correct answer.
     """
-
-    corrects = []
-    for i in range(len(generations)):
-        sentence = str(generations[i])
-        sentence = sentence.replace(",", "").replace(".", "")
-        prediction = re.search(r"\d+", sentence)
-        if prediction is None:
-            prediction = 0
-        else:
-            prediction = int(prediction.group())
-        answer = int(answers[i].replace("$", ""))
-        correct = int(abs(prediction / (answer + 1e-1) - 1.0) < 0.1)
-        corrects.append(correct)
-    return np.mean(corrects)
+    return SaraNumericAccumulator().update(generations, answers).result()
 
 
 def evaluate_definition_extraction(generations: List[str], answers: List[str]):
@@ -309,21 +338,7 @@ def evaluate_definition_extraction(generations: List[str], answers: List[str]):
     applying a stemmer. We then report accuracy over the number of times the generation
     matches ground truth.
     """
-
-    total = 0
-    correct = 0
-    for i in range(len(generations)):
-        answers_list = answers[i].split(",")
-        generations_list = generations[i].split(",")
-        normalized_answers = [normalize(a, stem=True) for a in answers_list]
-        normalized_gens = [normalize(g, stem=True) for g in generations_list]
-
-        total += 1
-        for gen in normalized_gens:
-            if gen in normalized_answers:
-                correct += 1
-                break
-    return correct / total
+    return DefinitionExtractionAccumulator().update(generations, answers).result()
 
 
 def evaluate_citation_open(generations: List[str], answers: List[str]):
@@ -333,45 +348,593 @@ def evaluate_citation_open(generations: List[str], answers: List[str]):
 
     NOTE: we do not check if the reporter citation/circuit is correct!
     """
-
-    normalized_answers = [normalize(a, stem=False) for a in answers]
-    normalized_gens = [normalize(g, stem=False) for g in generations]
-    total, correct = 0, 0
-    for g, a in zip(normalized_gens, normalized_answers):
-        total += 1
-        if a in g:
-            correct += 1
-    return correct / total
+    return CitationOpenAccumulator().update(generations, answers).result()
 
 
 def evaluate_ssla(generations: List[str], answers: List[str]):
     """
     For SSLA evaluation tasks, we measure F1.
     """
+    return SSLAAccumulator().update(generations, answers).result()
+
+
+def successor_liability_counts(generation: str, answer: str) -> Tuple[int, int, int]:
+    """
+    Returns (tp, fp, fn) of the predicted successor liability exceptions for one example.
+    """
+    generation = str(generation)
+    predictions = [c for c in SUCCESSOR_LIABILITY_CLASSES if c in generation]
+    return _successor_liability_tp_fp_fn(predictions, answer)
+
+
+def successor_liability_batch_counts(
+    generations: List[str], answers: List[str]
+) -> List[Tuple[int, int, int]]:
+    """
+    successor_liability_counts over a batch of examples. The exceptions are located
+    with one find_patterns scan over all generations, rather than per generation.
+    """
+    found = find_patterns(SUCCESSOR_LIABILITY_CLASSES, [str(g) for g in generations])
+    predictions: List[List[str]] = [[] for _ in generations]
+    for c, text_ids in zip(SUCCESSOR_LIABILITY_CLASSES, found):
+        for i in text_ids:
+            predictions[i].append(c)
+    return [_successor_liability_tp_fp_fn(p, a) for p, a in zip(predictions, answers)]
+
+
+def _successor_liability_tp_fp_fn(predictions: List[str], answer: str) -> Tuple[int, int, int]:
+    sample_answers = str(answer).split(",")
+
+    tp, fp = 0, 0
+    for prediction in predictions:
+        if prediction in sample_answers:
+            sample_answers.remove(prediction)
+            tp += 1
+        else:
+            fp += 1
+    return tp, fp, len(sample_answers)
+
+
+def sara_numeric_correct(generation: str, answer: str) -> int:
+    """
+    Returns 1 if the first number in the generation is within 10% of the answer, else 0.
+    """
+    sentence = str(generation)
+    sentence = sentence.replace(",", "").replace(".", "")
+    prediction = re.search(r"\d+", sentence)
+    if prediction is None:
+        prediction = 0
+    else:
+        prediction = int(prediction.group())
+    answer = int(answer.replace("$", ""))
+    return int(abs(prediction / (answer + 1e-1) - 1.0) < 0.1)
+
+
+def extract_first_numbers(generations: List[str]) -> "np.ndarray":
+    """
+    Returns the first number in each generation (after removing commas and periods),
+    or 0 if it has none, as a float array. All generations are scanned in one regex pass.
+    """
+    import numpy as np
+
+    generations = [str(g) for g in generations]
+    buffer = NUMBER_SEPARATOR.join(generations).translate(NUMBER_PUNCTUATION_TABLE)
+    digits = FIRST_NUMBER_PATTERN.findall(buffer)
+    if len(digits) != len(generations):
+        # A generation contains the separator itself, so fall back to one search per row.
+        digits = [
+            m.group() if (m := re.search(r"\d+", g.translate(NUMBER_PUNCTUATION_TABLE))) else ""
+            for g in generations
+        ]
+    # float() rather than int(): numbers beyond the float range become inf (and are never
+    # within 10% of a target) instead of raising OverflowError
+    return np.array([float(d) if d else 0.0 for d in digits], dtype=np.float64)
+
+
+def within_10pt(predictions: "np.ndarray", targets: "np.ndarray") -> "np.ndarray":
+    """
+    Boolean mask of the predictions that are within 10% of their targets.
+    """
+    import numpy as np
+
+    return np.abs(predictions / (targets + 1e-1) - 1.0) < 0.1
+
+
+def sara_numeric_hits(generations: List[str], answers: List[str]) -> "np.ndarray":
+    """
+    Vectorized sara_numeric_correct over whole columns of generations and answers.
+    """
+    import numpy as np
+
+    targets = np.array([int(a.replace("$", "")) for a in answers], dtype=np.float64)
+    return within_10pt(extract_first_numbers(generations), targets)
+
+
+@lru_cache(maxsize=NORMALIZE_CACHE_SIZE)
+def stemmed_answer_set(answer: str) -> FrozenSet[str]:
+    """
+    Stemmed, comma-separated gold answers of one definition_extraction example. Cached,
+    since the gold answers are the same on every run.
+    """
+    return frozenset(normalize_batch(answer.split(","), stem=True))
+
+
+def definition_extraction_correct(generation: str, answer: str) -> int:
+    """
+    Returns 1 if any stemmed, comma-separated fragment of the generation matches one
+    of the stemmed answers, else 0.
+    """
+    normalized_gens = normalize_batch(generation.split(","), stem=True)
+    return int(not stemmed_answer_set(answer).isdisjoint(normalized_gens))
+
+
+class DefinitionExtractionScorer:
+    """
+    Scores batches of definition_extraction generations against gold answers that are
+    stemmed once, when the scorer is built (e.g. once for the whole test split).
+    """
+
+    def __init__(self, answers: List[str], answer_sets: List[Iterable[str]] = None):
+        """
+        Args:
+            answers: gold answers
+            answer_sets: already stemmed gold answer sets, where known (entries may be None)
+        """
+        if answer_sets is None:
+            answer_sets = [None] * len(answers)
+        self.answer_sets = [
+            stemmed_answer_set(a) if s is None else frozenset(s)
+            for a, s in zip(answers, answer_sets)
+        ]
+
+    def score(self, generations: List[str], indices: List[int] = None) -> List[int]:
+        """
+        Returns 1/0 correctness for each generation.
+
+        Args:
+            generations: generations to score
+            indices: gold rows the generations answer (defaults to 0..len(generations)-1)
+        """
+        if indices is None:
+            indices = range(len(generations))
+        # Stem the fragments of the whole batch at once, so repeated fragments are
+        # only stemmed once.
+        fragments = [g.split(",") for g in generations]
+        stemmed = normalize_batch([f for row in fragments for f in row], stem=True)
+        correct = []
+        offset = 0
+        for i, row in zip(indices, fragments):
+            row_stemmed = stemmed[offset : offset + len(row)]
+            offset += len(row)
+            correct.append(int(not self.answer_sets[i].isdisjoint(row_stemmed)))
+        return correct
+
+
+def citation_open_correct(generation: str, answer: str) -> int:
+    """
+    Returns 1 if the normalized case name appears in the normalized generation, else 0.
+    """
+    return int(normalize(answer, stem=False) in normalize(generation, stem=False))
+
+
+def ssla_counts(generation: str, answer: str) -> Tuple[int, int, int]:
+    """
+    Returns (tp, fp, fn) for one SSLA example.
+
+    NOTE: unmatched generations are added to fp after every answer (not once per example),
+    which is how the benchmark has always been scored.
+    """
+    normalized_answers = normalize_batch(answer.split(","), stem=False)
+    normalized_gens = normalize_batch(str(generation).split(","), stem=False)
+
+    tp, fp, fn = 0, 0, 0
+    # Each answer is matched to the first remaining generation that contains it,
+    # and that generation is then removed.
+    remaining = len(normalized_gens)
+    for match in greedy_match(normalized_answers, normalized_gens):
+        if match is None:
+            fn += 1
+        else:
+            tp += 1
+            remaining -= 1
+        fp += remaining
+    return tp, fp, fn
+
+
+class MetricAccumulator:
+    """
+    Streaming version of a task metric. Feed (generations, answers) chunks to update()
+    and read the score with result(). The score matches evaluate() on the concatenated
+    chunks.
+
+    Accumulators can also be exported with state() (a JSON-serializable dict), rebuilt
+    with accumulator_from_state() and combined with merge(), so that shards of a task
+    scored on different machines yield the same score as a single run.
+    """
+
+    def update(self, generations: List[str], answers: List[str]) -> "MetricAccumulator":
+        generations = list(generations)
+        answers = list(answers)
+        if len(generations) != len(answers):
+            raise ValueError(
+                f"Got {len(generations)} generations but {len(answers)} answers"
+            )
+        self._update(generations, answers)
+        return self
+
+    def _update(self, generations: List[str], answers: List[str]):
+        raise NotImplementedError
+
+    def result(self):
+        raise NotImplementedError
+
+    def state(self) -> dict:
+        return {"accumulator": type(self).__name__, **self._state()}
+
+    def _state(self) -> dict:
+        raise NotImplementedError
+
+    def _load_state(self, state: dict):
+        raise NotImplementedError
+
+    def merge(self, other: "MetricAccumulator") -> "MetricAccumulator":
+        if type(other) is not type(self):
+            raise ValueError(
+                f"Cannot merge {type(other).__name__} into {type(self).__name__}"
+            )
+        self._merge(other)
+        return self
+
+    def _merge(self, other: "MetricAccumulator"):
+        raise NotImplementedError
+
+
+class BalancedAccuracyAccumulator(MetricAccumulator):
+    """
+    Confusion-matrix counts over normalized (answer, generation) pairs. Generations
+    that do not match their answer are counted under (answer, None), since only the
+    recall of each answer class enters the score; this keeps free-form generations
+    out of memory.
+    """
+
+    def __init__(self):
+        self.confusion: Dict[Tuple[str, str], int] = {}
+
+    def _update(self, generations, answers):
+        self.update_normalized(
+            normalize_batch(generations, stem=False), normalize_batch(answers, stem=False)
+        )
+
+    def update_normalized(
+        self, normalized_gens: List[str], normalized_answers: List[str]
+    ) -> "BalancedAccuracyAccumulator":
+        """
+        Adds (generation, answer) pairs that have already been passed through normalize().
+        """
+        for answer, generation in zip(normalized_answers, normalized_gens):
+            pair = (answer, generation if generation == answer else None)
+            self.confusion[pair] = self.confusion.get(pair, 0) + 1
+        return self
+
+    def result(self):
+        # Same computation as sklearn's balanced_accuracy_score: mean recall over the
+        # classes present in the answers, in sorted label order.
+        import numpy as np
+
+        totals: Dict[str, int] = {}
+        hits: Dict[str, int] = {}
+        for (answer, generation), count in self.confusion.items():
+            totals[answer] = totals.get(answer, 0) + count
+            if answer == generation:
+                hits[answer] = hits.get(answer, 0) + count
+        labels = sorted(totals)
+        if not labels:
+            raise ValueError("No examples to score")
+        recalls = np.array([hits.get(l, 0) for l in labels]) / np.array(
+            [totals[l] for l in labels]
+        )
+        return float(np.mean(recalls))
+
+    def _state(self):
+        return {"confusion": [[a, g, c] for (a, g), c in self.confusion.items()]}
+
+    def _load_state(self, state):
+        for a, g, c in state["confusion"]:
+            self.confusion[(a, g)] = self.confusion.get((a, g), 0) + c
+
+    def _merge(self, other):
+        self._load_state(other._state())
+
+
+class F1Accumulator(MetricAccumulator):
+    """
+    Micro-F1 from tp / fp / fn counts summed over examples.
+    """
+
+    def __init__(self):
+        self.tp, self.fp, self.fn = 0, 0, 0
+
+    def _counts(self, generation: str, answer: str) -> Tuple[int, int, int]:
+        raise NotImplementedError
+
+    def row_counts(self, generations: List[str], answers: List[str]) -> List[Tuple[int, int, int]]:
+        """
+        Returns (tp, fp, fn) of each example, without adding them to the totals.
+        """
+        return [self._counts(g, a) for g, a in zip(generations, answers)]
+
+    def _update(self, generations, answers):
+        for tp, fp, fn in self.row_counts(generations, answers):
+            self.add_counts(tp, fp, fn)
+
+    def add_counts(self, tp: int, fp: int, fn: int) -> "F1Accumulator":
+        """
+        Adds tp / fp / fn counts that were computed elsewhere (e.g. per scored row).
+        """
+        self.tp += tp
+        self.fp += fp
+        self.fn += fn
+        return self
+
+    def result(self):
+        return 2 * self.tp / (2 * self.tp + self.fp + self.fn)
+
+    def _state(self):
+        return {"tp": self.tp, "fp": self.fp, "fn": self.fn}
+
+    def _load_state(self, state):
+        self.tp += state["tp"]
+        self.fp += state["fp"]
+        self.fn += state["fn"]
+
+    def _merge(self, other):
+        self._load_state(other._state())
+
+
+class SuccessorLiabilityAccumulator(F1Accumulator):
+    def _counts(self, generation, answer):
+        return successor_liability_counts(generation, answer)
+
+    def row_counts(self, generations, answers):
+        return successor_liability_batch_counts(generations, answers)
+
+
+class SSLAAccumulator(F1Accumulator):
+    def _counts(self, generation, answer):
+        return ssla_counts(generation, answer)
+
+
+class AccuracyAccumulator(MetricAccumulator):
+    """
+    Fraction of examples scored as correct.
+    """
+
+    def __init__(self):
+        self.correct, self.total = 0, 0
+
+    def _correct(self, generation: str, answer: str) -> int:
+        raise NotImplementedError
+
+    def _update(self, generations, answers):
+        for generation, answer in zip(generations, answers):
+            self.add_counts(self._correct(generation, answer), 1)
+
+    def add_counts(self, correct: int, total: int) -> "AccuracyAccumulator":
+        """
+        Adds the number of correct examples out of total examples scored elsewhere.
+        """
+        self.correct += correct
+        self.total += total
+        return self
+
+    def result(self):
+        return self.correct / self.total
+
+    def _state(self):
+        return {"correct": self.correct, "total": self.total}
+
+    def _load_state(self, state):
+        self.correct += state["correct"]
+        self.total += state["total"]
+
+    def _merge(self, other):
+        self._load_state(other._state())
+
+
+class SaraNumericAccumulator(AccuracyAccumulator):
+    def _correct(self, generation, answer):
+        return sara_numeric_correct(generation, answer)
+
+    def _update(self, generations, answers):
+        self.add_counts(int(sara_numeric_hits(generations, answers).sum()), len(generations))
+
+
+class DefinitionExtractionAccumulator(AccuracyAccumulator):
+    def _correct(self, generation, answer):
+        return definition_extraction_correct(generation, answer)
+
+    def _update(self, generations, answers):
+        self.add_counts(sum(DefinitionExtractionScorer(answers).score(generations)), len(generations))
+
+
+class CitationOpenAccumulator(AccuracyAccumulator):
+    def _correct(self, generation, answer):
+        return citation_open_correct(generation, answer)
+
+
+ACCUMULATORS = {
+    cls.__name__: cls
+    for cls in [
+        BalancedAccuracyAccumulator,
+        F1Accumulator,
+        SuccessorLiabilityAccumulator,
+        SSLAAccumulator,
+        AccuracyAccumulator,
+        SaraNumericAccumulator,
+        DefinitionExtractionAccumulator,
+        CitationOpenAccumulator,
+    ]
+}
+
+
+def accumulator_from_state(state: dict) -> MetricAccumulator:
+    """
+    Rebuilds an accumulator from the output of MetricAccumulator.state().
+    """
+    if state.get("accumulator") not in ACCUMULATORS:
+        raise ValueError(f"Unknown accumulator state: {state.get('accumulator')}")
+    accumulator = ACCUMULATORS[state["accumulator"]]()
+    accumulator._load_state(state)
+    return accumulator
+
+
+def merge_states(states: Iterable[dict]) -> dict:
+    """
+    Merges partial accumulator states (e.g. from different shards of one task) into one.
+    """
+    merged = None
+    for state in states:
+        accumulator = accumulator_from_state(state)
+        merged = accumulator if merged is None else merged.merge(accumulator)
+    if merged is None:
+        raise ValueError("No states to merge")
+    return merged.state()
+
+
+def get_accumulator(task: str) -> MetricAccumulator:
+    """
+    Returns an empty streaming accumulator for the task's metric.
+    """
+
+    if task in EXACT_MATCH_BALANCED_ACC_TASKS:
+        return BalancedAccuracyAccumulator()
+    elif task == "sara_numeric":
+        return SaraNumericAccumulator()
+    elif task == "successor_liability":
+        return SuccessorLiabilityAccumulator()
+    elif task == "citation_prediction_open":
+        return CitationOpenAccumulator()
+    elif task == "definition_extraction":
+        return DefinitionExtractionAccumulator()
+    elif task.startswith("ssla"):
+        return SSLAAccumulator()
+    elif task in MANUAL_EVAL_TASKS:
+        raise Exception("This task needs to be manually evaluated:", task)
+    else:
+        raise Exception(f"Unknown task: {task}")
+
+
+def evaluate_streaming(task: str, chunks: Iterable[Tuple[List[str], List[str]]]):
+    """
+    Computes performance metric for task from an iterable of (generations, answers) chunks,
+    without holding all generations in memory.
+
+    Args:
+        task: name of task
+        chunks: iterable of (generations, answers) pairs, e.g. read from a file in batches
+
+    Returns: score for generations on given task, identical to evaluate() on the full lists
+    """
+
+    accumulator = get_accumulator(task)
+    for generations, answers in chunks:
+        accumulator.update(generations, answers)
+    return accumulator.result()
+
+
+def _evaluate_group(args: Tuple[str, List[str], List[str]]):
+    task, generations, answers = args
+    return evaluate(task, generations, answers)
+
+
+def evaluate_suite(
+    results: "pd.DataFrame", num_workers: int = None, group_by: Sequence[str] = ()
+) -> Tuple["pd.DataFrame", "pd.DataFrame"]:
+    """
+    Scores every task in a long-format results table, with tasks scored concurrently
+    in a process pool.
+
+    Args:
+        results: dataframe with columns task, index, generation and answer (one row per
+            sample), plus any columns named in group_by
+        num_workers: number of worker processes (defaults to the number of CPUs)
+        group_by: extra columns to score separately, e.g. ["model"] for a sweep over
+            several models
+
+    Returns:
+        scores: one row per (group_by..., task) with the task score and number of samples
+        categories: one row per (group_by..., category) with the mean score over the
+            scored tasks of each category in tasks.TASK_CATEGORIES
+
+    Tasks that need manual evaluation are skipped.
+    """
+    from concurrent.futures import ProcessPoolExecutor
+    import pandas as pd
+
+    group_by = list(group_by)
+    results = results[~results["task"].isin(MANUAL_EVAL_TASKS)]
+
+    keys, jobs = [], []
+    for key, group in results.groupby(group_by + ["task"], sort=True):
+        keys.append(key)
+        jobs.append((key[-1], group["generation"].tolist(), group["answer"].tolist()))
+
+    with ProcessPoolExecutor(max_workers=num_workers) as executor:
+        task_scores = list(executor.map(_evaluate_group, jobs))
+
+    scores = pd.DataFrame(keys, columns=group_by + ["task"])
+    scores["score"] = task_scores
+    scores["num_samples"] = [len(generations) for _, generations, _ in jobs]
+
+    category_rows = []
+    for key, group in scores.groupby(group_by, sort=True) if group_by else [((), scores)]:
+        for category, category_tasks in TASK_CATEGORIES.items():
+            category_scores = group[group["task"].isin(category_tasks)]["score"]
+            if len(category_scores) > 0:
+                category_rows.append(
+                    (*key, category, category_scores.mean(), len(category_scores))
+                )
+    categories = pd.DataFrame(
+        category_rows, columns=group_by + ["category", "score", "num_tasks"]
+    )
+    return scores, categories
+
+
+def read_results(path: str) -> "pd.DataFrame":
+    """
+    Reads a long-format results table from a .tsv, .csv or .jsonl file.
+    """
+    import pandas as pd
+
+    if path.endswith(".jsonl"):
+        return pd.read_json(path, lines=True, dtype=False)
+    sep = "\t" if path.endswith(".tsv") else ","
+    return pd.read_csv(path, sep=sep, dtype=str, keep_default_na=False)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Score a LegalBench run across all tasks")
+    parser.add_argument("--results", type=str, required=True, help="Results table (.tsv, .csv or .jsonl) with task, index, generation and answer columns")
+    parser.add_argument("--group_by", type=str, nargs="*", default=[], help="Extra columns to score separately, e.g. model")
+    parser.add_argument("--num_workers", type=int, default=None, help="Number of worker processes")
+    parser.add_argument("--output", type=str, help="Optional path to write per-task scores to as TSV")
+    parser.add_argument("--category_output", type=str, help="Optional path to write category scores to as TSV")
+
+    args = parser.parse_args()
+
+    results = read_results(args.results)
+    scores, categories = evaluate_suite(results, args.num_workers, args.group_by)
+
+    print(scores.to_string(index=False))
+    print()
+    print(categories.to_string(index=False))
+    if args.output is not None:
+        scores.to_csv(args.output, sep="\t", index=False)
+    if args.category_output is not None:
+        categories.to_csv(args.category_output, sep="\t", index=False)
+
+
+if __name__ == "__main__":
+    main()
 
-    tp = 0
-    fp = 0
-    fn = 0
-    for i in range(len(generations)):
-
-        answers_split = answers[i].split(",")
-        generations_split = str(generations[i]).split(",")
-        normalized_answers = [normalize(a, stem=False) for a in answers_split]
-        normalized_gens = [normalize(g, stem=False) for g in generations_split]
-
-        # For each answer, check if it is contained in any of the generations.
-        # If it is, delete that generation.
-        for a in normalized_answers:
-            found = False
-            for j in range(len(normalized_gens)):
-                if a in normalized_gens[j]:
-                    tp += 1
-                    found = True
-                    break
-            if found:
-                del normalized_gens[j]
-            else:
-                fn += 1
-            fp += len(normalized_gens)
-    f1 = 2 * tp / (2 * tp + fp + fn)
-    return f1
+# invoke via python -m evaluation --results <results table> [--group_by model]
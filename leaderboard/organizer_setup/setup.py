@@ -1,16 +1,25 @@
 import weave
-from weave import Dataset, Evaluation
 from weave.flow import leaderboard
-from weave.trace.ref_util import get_ref
 from leaderboard.scorer.legalbench_scorer import LegalBenchScorer
-from leaderboard.organizer_setup.utils.upload_datasets import upload_dataset
+from leaderboard.scorer.batched_evaluation import BatchedEvaluation
+from leaderboard.organizer_setup.utils.upload_datasets import build_dataset, load_task_data
 from leaderboard.organizer_setup.utils.get_task_metric import get_task_metric
 from leaderboard.organizer_setup.utils.preprocessing import preprocess_example
+from evaluation import MANUAL_EVAL_TASKS
+from prompt_registry import get_prompt
+from tasks import TASKS as ALL_TASKS
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Optional
 import argparse
+import hashlib
+import json
+import os
+import sys
+import traceback
 
 # setup
 HUGGINGFACE_DATASET = "nguha/legalbench"
-# sample selection of tasks, for real leaderboard one could simply import all task names from evaluation.py
+# sample selection of tasks, pass --all_tasks to set up a leaderboard for every task
 TASKS = [
     "abercrombie",
     "sara_numeric",
@@ -19,46 +28,176 @@ TASKS = [
     "definition_extraction",
     "ssla_company_defendants",
 ]
+# bump to force every task to be republished after changing how tasks are set up
+SETUP_VERSION = 2
+STATE_FILE = ".leaderboard_setup_state.json"
+
+
+class LocalRef:
+    """Reference returned by LocalPublisher, mirroring the uri() of a weave ref."""
+
+    def __init__(self, uri: str):
+        self._uri = uri
+
+    def uri(self) -> str:
+        return self._uri
+
+
+class LocalPublisher:
+    """
+    Stand-in for weave.publish that records published objects as JSON files in a local
+    directory, to exercise the setup (e.g. concurrency and incremental skipping)
+    without a weave project.
+    """
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    def __call__(self, obj, name: str) -> LocalRef:
+        path = os.path.join(self.directory, f"{name}.json")
+        with open(path, "w") as out_file:
+            json.dump({"name": name, "type": type(obj).__name__}, out_file)
+        return LocalRef(f"local:///{os.path.abspath(path)}")
+
+
+def task_fingerprint(task: str, df, desc: str) -> str:
+    """
+    Hash of everything that goes into a task's published objects: its data and
+    description, its scorer configuration and its base prompt.
+    """
+    digest = hashlib.sha256()
+    scorer_config = {
+        "setup_version": SETUP_VERSION,
+        "scorer": LegalBenchScorer.__name__,
+        "task": task,
+        "summary_metric": get_task_metric(task),
+    }
+    digest.update(json.dumps(scorer_config, sort_keys=True).encode())
+    digest.update(desc.encode())
+    digest.update(df.to_csv(index=False).encode())
+    try:
+        digest.update(get_prompt(task).encode())
+    except KeyError:
+        pass
+    return digest.hexdigest()
+
+
+def load_state(path: str) -> dict:
+    if not os.path.exists(path):
+        return {}
+    with open(path) as in_file:
+        return json.load(in_file)
+
+
+def save_state(path: str, state: dict):
+    # write to a temporary file first so an interrupted setup can't corrupt the state
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w") as out_file:
+        json.dump(state, out_file, indent=2, sort_keys=True)
+    os.replace(tmp_path, path)
+
+
+def setup_task(task: str, publish=weave.publish, published_fingerprint: Optional[str] = None):
+    """
+    Loads a task and publishes its dataset, evaluation and leaderboard.
+    Returns (fingerprint, published), skipping the publish when the task's fingerprint
+    equals published_fingerprint.
+    """
+    df, desc = load_task_data(HUGGINGFACE_DATASET, task)
+    fingerprint = task_fingerprint(task, df, desc)
+    if fingerprint == published_fingerprint:
+        return fingerprint, False
+
+    weave_ds = build_dataset(task, df, desc)
+    dataset = publish(weave_ds, name=weave_ds.name)
+    # a local ref can't be resolved by weave, so the evaluation holds the dataset itself
+    if isinstance(dataset, LocalRef):
+        dataset = weave_ds
+    # scores model outputs in blocks with LegalBenchScorer.score_batch
+    evaluation = BatchedEvaluation(
+        name=f"{task}_evaluation",
+        dataset=dataset,
+        scorers=[LegalBenchScorer(task=task)],
+        preprocess_model_input=preprocess_example
+    )
+    evaluation_ref = publish(evaluation, f"{task}_evaluation")
+    leaderboard_spec = leaderboard.Leaderboard(
+        name=f"{task}",
+        description=f"""
+This leaderboard compares the performance of models on the LegalBench {task} task.""",
+        columns=[
+            leaderboard.LeaderboardColumn(
+                evaluation_object_ref=evaluation_ref.uri(),
+                scorer_name="LegalBenchScorer",
+                summary_metric_path=get_task_metric(task),
+            )
+        ],
+    )
+
+    # Publish the leaderboard
+    publish(leaderboard_spec, f"{task}_leaderboard")
+    return fingerprint, True
+
 
 def main():
     parser = argparse.ArgumentParser(description='Setup LegalBench leaderboard')
     parser.add_argument('--team', type=str, help='Weave team name')
     parser.add_argument('--project', type=str, help='Weave project name')
-    
+    parser.add_argument('--tasks', type=str, nargs='*', default=TASKS, help='Tasks to set up (defaults to the sample selection)')
+    parser.add_argument('--all_tasks', action='store_true', help='Set up every task with an automatic metric')
+    parser.add_argument('--workers', type=int, default=1, help='Number of tasks loaded and published concurrently')
+    parser.add_argument('--incremental', action='store_true', help='Skip tasks whose data, scorer and prompt are unchanged since the last publish')
+    parser.add_argument('--state_file', type=str, default=STATE_FILE, help='Where task fingerprints of published tasks are recorded')
+    parser.add_argument('--local_dir', type=str, help='Publish to this local directory instead of weave (for testing)')
+
     args = parser.parse_args()
-    
+
     WEAVE_TEAM = args.team
     WEAVE_PROJECT = args.project
     SPLIT = "test"
 
-    client = weave.init(f"{WEAVE_TEAM}/{WEAVE_PROJECT}")
-
-    for task in TASKS:
-        dataset = upload_dataset(HUGGINGFACE_DATASET, task)
-        evaluation = Evaluation(
-            name=f"{task}_evaluation", 
-            dataset=dataset, 
-            scorers=[LegalBenchScorer(task=task)],
-            preprocess_model_input=preprocess_example
-        )
-        weave.publish(evaluation, f"{task}_evaluation")
-        leaderboard_spec = leaderboard.Leaderboard(
-            name=f"{task}",
-            description=f"""
-This leaderboard compares the performance of models on the LegalBench {task} task.""",
-            columns=[
-                leaderboard.LeaderboardColumn(
-                    evaluation_object_ref=get_ref(evaluation).uri(),
-                    scorer_name="LegalBenchScorer",
-                    summary_metric_path=get_task_metric(task),
-                )
-            ],
-        )
-        
-        # Publish the leaderboard
-        weave.publish(leaderboard_spec, f"{task}_leaderboard")
+    if args.local_dir is not None:
+        publish = LocalPublisher(args.local_dir)
+        target = os.path.abspath(args.local_dir)
+    else:
+        client = weave.init(f"{WEAVE_TEAM}/{WEAVE_PROJECT}")
+        publish = weave.publish
+        target = f"{WEAVE_TEAM}/{WEAVE_PROJECT}"
+
+    tasks = args.tasks
+    if args.all_tasks:
+        tasks = [t for t in ALL_TASKS if t not in MANUAL_EVAL_TASKS]
+
+    # fingerprints are recorded per publish target; only the main thread writes them
+    state = load_state(args.state_file)
+    published = dict(state.get(target, {})) if args.incremental else {}
+
+    with ThreadPoolExecutor(max_workers=args.workers) as executor:
+        futures = {
+            executor.submit(setup_task, task, publish, published.get(task)): task
+            for task in tasks
+        }
+        failed = []
+        for future in as_completed(futures):
+            task = futures[future]
+            try:
+                fingerprint, was_published = future.result()
+            except Exception:
+                # record the other tasks, so a rerun only republishes the failed ones
+                print(f"{task}: failed")
+                traceback.print_exc()
+                failed.append(task)
+                continue
+            print(f"{task}: {'published' if was_published else 'unchanged, skipped'}")
+            state.setdefault(target, {})[task] = fingerprint
+            save_state(args.state_file, state)
+
+    if failed:
+        print(f"Setup failed for {len(failed)} of {len(tasks)} tasks: {', '.join(sorted(failed))}")
+        sys.exit(1)
 
 if __name__ == "__main__":
     main()
 
-# invoke via python -m leaderboard.organizer_setup.setup --team <name of weave team> --project <name of weave project>
\ No newline at end of file
+# invoke via python -m leaderboard.organizer_setup.setup --team <name of weave team> --project <name of weave project> [--workers 8 --incremental]
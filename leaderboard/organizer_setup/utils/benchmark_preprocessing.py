@@ -0,0 +1,83 @@
+"""
+Compares the per-row cost and peak memory of building model inputs from dataset rows by
+copying them (the previous preprocess_example) against the read-only row views of
+view_example, on rows built from the MAUD tasks.
+"""
+import argparse
+import glob
+import os
+import time
+import tracemalloc
+from types import SimpleNamespace
+
+import pandas as pd
+
+from leaderboard.organizer_setup.utils.preprocessing import view_example
+
+
+def copy_example(example):
+    # previous preprocess_example: copies each row, reflecting over non-mapping rows
+    if hasattr(example, 'keys'):
+        example_dict = dict(example)
+    else:
+        example_dict = {}
+        for attr in dir(example):
+            if not attr.startswith('_'):
+                try:
+                    value = getattr(example, attr)
+                    if not callable(value):
+                        example_dict[attr] = value
+                except:
+                    pass
+    result = {"data": example_dict}
+    for key, value in example_dict.items():
+        result[key] = value
+    return result
+
+
+def load_maud_rows(tasks_dir: str, num_rows: int):
+    paths = sorted(glob.glob(os.path.join(tasks_dir, "maud_*", "train.tsv")))
+    df = pd.concat([pd.read_csv(p, sep="\t", dtype=str, keep_default_na=False) for p in paths])
+    records = df.to_dict("records")
+    return [records[i % len(records)] for i in range(num_rows)]
+
+
+def benchmark(preprocess, rows, repeats: int):
+    best = float("inf")
+    for _ in range(repeats):
+        start = time.perf_counter()
+        for row in rows:
+            preprocess(row)
+        best = min(best, time.perf_counter() - start)
+
+    # peak memory while an evaluation holds the inputs of every row
+    tracemalloc.start()
+    inputs = [preprocess(row) for row in rows]
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del inputs
+    return best / len(rows), peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark preprocess_example on MAUD rows')
+    parser.add_argument('--tasks_dir', type=str, default="tasks", help='Directory of the LegalBench tasks')
+    parser.add_argument('--num_rows', type=int, default=10000, help='Number of rows to preprocess')
+    parser.add_argument('--repeats', type=int, default=5, help='Timing repeats, the best is reported')
+
+    args = parser.parse_args()
+
+    dict_rows = load_maud_rows(args.tasks_dir, args.num_rows)
+    object_rows = [SimpleNamespace(**row) for row in dict_rows]
+    mean_chars = sum(len(row["text"]) for row in dict_rows) / len(dict_rows)
+    print(f"{len(dict_rows)} MAUD rows, {mean_chars:.0f} characters of text on average")
+
+    for row_kind, rows in [("mapping rows", dict_rows), ("object rows", object_rows)]:
+        for name, preprocess in [("copy", copy_example), ("view", view_example)]:
+            per_row, peak = benchmark(preprocess, rows, args.repeats)
+            print(f"{row_kind:<13} {name:<5} {per_row * 1e6:8.2f} us/row  peak {peak / 2**20:8.2f} MiB")
+
+if __name__ == "__main__":
+    main()
+
+# invoke via python -m leaderboard.organizer_setup.utils.benchmark_preprocessing [--num_rows 10000]
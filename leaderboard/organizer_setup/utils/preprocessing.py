@@ -1,35 +1,99 @@
 import weave
+from collections.abc import Mapping
+import dataclasses
+
+# row type -> names of its data attributes, for rows that are not mappings
+_FIELD_CACHE = {}
+
+
+class RowView(Mapping):
+    """
+    Read-only mapping over a dataset row. Values are read from the row on access,
+    so no per-row copy of the columns is made. weave serializes it as a dict of the
+    row's fields.
+    """
+
+    __slots__ = ("_row", "_fields")
+
+    def __init__(self, row, fields):
+        self._row = row
+        self._fields = fields
+
+    def __getitem__(self, key):
+        if self._fields is None:
+            return self._row[key]
+        if key not in self._fields:
+            raise KeyError(key)
+        return getattr(self._row, key)
+
+    def __iter__(self):
+        return iter(self._row.keys() if self._fields is None else self._fields)
+
+    def __len__(self):
+        return len(self._row.keys() if self._fields is None else self._fields)
+
+    def to_dict(self) -> dict:
+        """
+        Copies the row into a dict. weave calls this to serialize the view into traces
+        (see weave.trace.serialization.dictifiable), so the copy is only made when the
+        row is logged.
+        """
+        return dict(self)
+
+    def __repr__(self):
+        return f"RowView({self._row!r})"
+
+
+def row_fields(example):
+    """
+    Returns the names of the data attributes of a non-mapping row. The field list is
+    discovered once per row type, since the rows of a dataset share their columns.
+    """
+    row_type = type(example)
+    fields = _FIELD_CACHE.get(row_type)
+    if fields is None:
+        if hasattr(example, "_fields"):
+            # namedtuple
+            fields = tuple(example._fields)
+        elif dataclasses.is_dataclass(example):
+            fields = tuple(f.name for f in dataclasses.fields(example))
+        else:
+            # Dynamically discover all attributes, excluding built-in Python attributes
+            # and methods
+            fields = []
+            for attr in dir(example):
+                if not attr.startswith('_'):
+                    try:
+                        if not callable(getattr(example, attr)):
+                            fields.append(attr)
+                    except Exception:
+                        pass
+            fields = tuple(fields)
+        _FIELD_CACHE[row_type] = fields
+    return fields
+
+
+def view_example(example):
+    """
+    Builds the model input for a row: the row as a read-only view under "data", plus
+    each column as a separate key. Values are shared with the row, not copied.
+    """
+    if hasattr(example, 'keys'):
+        result = {"data": RowView(example, None)}
+        result.update(example)
+        return result
+    fields = row_fields(example)
+    result = {"data": RowView(example, fields)}
+    for field in fields:
+        result[field] = getattr(example, field)
+    return result
+
 
 @weave.op()
 def preprocess_example(example):
     """
     Preprocesses each example before evaluation.
-    This function receives the dataset row and returns both the full data dict
-    and individual columns as separate keys.
+    This function receives the dataset row and returns both a read-only view of the
+    full row and individual columns as separate keys.
     """
-    
-    # Convert example to dict
-    if hasattr(example, 'keys'):
-        example_dict = dict(example)
-    else:
-        # Dynamically discover all attributes, excluding built-in Python attributes
-        example_dict = {}
-        for attr in dir(example):
-            # Skip built-in attributes that start with underscore
-            if not attr.startswith('_'):
-                try:
-                    value = getattr(example, attr)
-                    # Skip methods and other non-data attributes
-                    if not callable(value):
-                        example_dict[attr] = value
-                except:
-                    pass
-    
-    # Return both the full data dict and individual columns
-    result = {"data": example_dict}
-    
-    # Add individual columns as separate keys
-    for key, value in example_dict.items():
-        result[key] = value
-    
-    return result
\ No newline at end of file
+    return view_example(example)
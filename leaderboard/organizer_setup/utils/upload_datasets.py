@@ -1,7 +1,8 @@
 import textwrap
 import weave
 from weave import Dataset
-from datasets import load_dataset, load_dataset_builder
+from datasets import load_dataset
+from leaderboard.scorer.row_level_metrics import gold_columns
 
 # ------------------------------------------------------------------
 HUGGINGFACE_DATASET = "nguha/legalbench"
@@ -34,20 +35,30 @@ def build_description(info, split):
         Citation: {info.citation}
     """)
 
-def upload_dataset(hf_dataset: str, task: str):
-    # use builder to access metadata
-    builder = load_dataset_builder(hf_dataset, task)
-    # load data
-    ds = load_dataset(HUGGINGFACE_DATASET, task, split=SPLIT)
+def load_task_data(hf_dataset: str, task: str):
+    """Load the test split of a task and its description, with precomputed gold columns."""
+    # a single load; the split's info carries the same metadata as the dataset builder
+    ds = load_dataset(hf_dataset, task, split=SPLIT)
 
-    info = builder.info
+    info = ds.info
     df   = ds.to_pandas()
     desc = build_description(info, SPLIT)
 
-    weave_ds = Dataset(
+    # precompute the gold answers in the form the scorer compares against
+    for column, values in gold_columns(task, df["answer"].tolist()).items():
+        df[column] = values
+
+    return df, desc
+
+def build_dataset(task: str, df, desc: str) -> Dataset:
+    return Dataset(
         name        = f"{task}_{SPLIT}",
         rows        = df,
         description = desc,
     )
 
-    return weave.publish(weave_ds, name=weave_ds.name)
+def upload_dataset(hf_dataset: str, task: str, publish=weave.publish):
+    df, desc = load_task_data(hf_dataset, task)
+    weave_ds = build_dataset(task, df, desc)
+
+    return publish(weave_ds, name=weave_ds.name)
@@ -0,0 +1,182 @@
+"""Local mock of an OpenAI-compatible chat completions endpoint, for testing the
+submission scripts without calling a provider. Every completion echoes the last line of
+the prompt after a fixed latency, except for a fraction of requests that stall. Like
+a provider, it can answer with 429s beyond a number of requests in flight, or at random. GET /stats reports the number of requests
+served and rate limited, and the peak number of requests in flight."""
+
+import argparse
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class MockState:
+    def __init__(
+        self,
+        latency: float,
+        max_in_flight: int = None,
+        error_rate: float = 0.0,
+        retry_after: float = None,
+        stall_rate: float = 0.0,
+        stall_latency: float = 10.0,
+    ):
+        self.latency = latency
+        self.stall_rate = stall_rate
+        self.stall_latency = stall_latency
+        self.max_in_flight = max_in_flight
+        self.error_rate = error_rate
+        self.retry_after = retry_after
+        self.lock = threading.Lock()
+        self.requests = 0
+        self.rate_limited = 0
+        self.in_flight = 0
+        self.peak_in_flight = 0
+
+    def stats(self) -> dict:
+        with self.lock:
+            return {
+                "requests": self.requests,
+                "rate_limited": self.rate_limited,
+                "in_flight": self.in_flight,
+                "peak_in_flight": self.peak_in_flight,
+            }
+
+
+class MockHandler(BaseHTTPRequestHandler):
+    # HTTP/1.1 so that clients can keep connections alive
+    protocol_version = "HTTP/1.1"
+    state: MockState = None
+
+    def _send_json(self, status: int, body: dict, headers: dict = None):
+        payload = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        try:
+            self.wfile.write(payload)
+        except (BrokenPipeError, ConnectionResetError):
+            # the client gave up on the request, e.g. a cancelled hedge
+            self.close_connection = True
+
+    def do_GET(self):
+        if self.path.rstrip("/").endswith("/stats"):
+            self._send_json(200, self.state.stats())
+        else:
+            self._send_json(404, {"error": {"message": f"Unknown path {self.path}"}})
+
+    def do_POST(self):
+        try:
+            request = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))))
+        except ValueError:
+            # the client disconnected before sending the whole request
+            self.close_connection = True
+            return
+        if not self.path.rstrip("/").endswith("/chat/completions"):
+            self._send_json(404, {"error": {"message": f"Unknown path {self.path}"}})
+            return
+
+        state = self.state
+        with state.lock:
+            over_limit = state.max_in_flight is not None and state.in_flight >= state.max_in_flight
+            if over_limit or random.random() < state.error_rate:
+                state.rate_limited += 1
+                rate_limited = True
+            else:
+                rate_limited = False
+        if rate_limited:
+            headers = {} if state.retry_after is None else {"Retry-After": str(state.retry_after)}
+            self._send_json(429, {"error": {"message": "Rate limit exceeded", "type": "rate_limit_error"}}, headers)
+            return
+
+        with state.lock:
+            state.requests += 1
+            state.in_flight += 1
+            state.peak_in_flight = max(state.peak_in_flight, state.in_flight)
+        try:
+            time.sleep(state.stall_latency if random.random() < state.stall_rate else state.latency)
+            prompt = request["messages"][-1]["content"]
+            if isinstance(prompt, list):
+                # joined with newlines, as vLLM-based servers do
+                prompt = "\n".join(part["text"] for part in prompt if part["type"] == "text")
+            generation = prompt.strip().split("\n")[-1]
+            self._send_json(200, {
+                "id": f"mock-{state.requests}",
+                "object": "chat.completion",
+                "created": int(time.time()),
+                "model": request["model"],
+                "choices": [{
+                    "index": 0,
+                    "message": {"role": "assistant", "content": generation},
+                    "finish_reason": "stop",
+                }],
+                "usage": {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0},
+            })
+        finally:
+            with state.lock:
+                state.in_flight -= 1
+
+    def log_message(self, format, *args):
+        pass
+
+
+def serve(
+    host: str = "127.0.0.1",
+    port: int = 8000,
+    latency: float = 0.1,
+    max_in_flight: int = None,
+    error_rate: float = 0.0,
+    retry_after: float = None,
+    stall_rate: float = 0.0,
+    stall_latency: float = 10.0,
+) -> ThreadingHTTPServer:
+    """
+    Starts the mock server on a background thread and returns it; call shutdown() to stop.
+    """
+    state = MockState(latency, max_in_flight, error_rate, retry_after, stall_rate, stall_latency)
+    handler = type("Handler", (MockHandler,), {"state": state})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Mock OpenAI-compatible chat completions server')
+    parser.add_argument('--host', default='127.0.0.1', type=str, help='Host to listen on')
+    parser.add_argument('--port', default=8000, type=int, help='Port to listen on')
+    parser.add_argument('--latency', default=0.1, type=float, help='Seconds each completion takes')
+    parser.add_argument('--max_in_flight', type=int, help='Answer 429 to requests beyond this many in flight')
+    parser.add_argument('--error_rate', default=0.0, type=float, help='Fraction of requests answered with a 429 at random')
+    parser.add_argument('--retry_after', type=float, help='Retry-After seconds sent with 429s')
+    parser.add_argument('--stall_rate', default=0.0, type=float, help='Fraction of completions that stall')
+    parser.add_argument('--stall_latency', default=10.0, type=float, help='Seconds a stalled completion takes')
+
+    args = parser.parse_args()
+
+    server = serve(
+        args.host,
+        args.port,
+        args.latency,
+        args.max_in_flight,
+        args.error_rate,
+        args.retry_after,
+        args.stall_rate,
+        args.stall_latency,
+    )
+    print(f"Serving mock completions on http://{args.host}:{args.port}/v1")
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        server.shutdown()
+
+if __name__ == "__main__":
+    main()
+
+# invoke via python -m leaderboard.participant_setup.mock_server --port 8000
+# and point a provider at it, e.g. --openai_base_url http://127.0.0.1:8000/v1
@@ -0,0 +1,415 @@
+"""Async clients for the LLM providers called by the submission scripts.
+
+Each provider gets one AsyncOpenAI client on a pool of keep-alive HTTP connections,
+and an adaptive limit on the requests it has in flight, so the evaluations of many
+(task, model) pairs can share one event loop without exceeding provider limits.
+
+The limit follows AIMD: it grows by about one request per round trip while calls
+succeed and is halved on rate limits (429), timeouts and sustained increases in
+latency. Rate-limited and transient failures are retried with jittered exponential
+backoff, honoring the provider's Retry-After.
+
+Optionally, requests are hedged: when a call takes longer than a percentile of the
+model's recent latencies, a duplicate is sent and whichever finishes first is used,
+with the number of duplicates capped at a fraction of the model's requests."""
+
+import asyncio
+import os
+import random
+import time
+from collections import deque
+from email.utils import parsedate_to_datetime
+from typing import Dict, List, Optional, Tuple
+
+from leaderboard.participant_setup.response_cache import ResponseCache, cache_key
+
+# provider -> client configuration; in-flight requests start at initial_concurrency
+# and adapt between 1 and max_concurrency. split_prefix sends a prompt prefix as its
+# own text part, which is only the same prompt on servers that join the parts of a
+# message verbatim (vLLM-based servers, for one, join them with newlines)
+PROVIDERS = {
+    "openai": {
+        "base_url": None,
+        "api_key_env": "OPENAI_API_KEY",
+        "initial_concurrency": 8,
+        "max_concurrency": 64,
+        "split_prefix": False,
+    },
+    "together": {
+        "base_url": "https://api.together.xyz",
+        "api_key_env": "TOGETHER_API_KEY",
+        "initial_concurrency": 8,
+        "max_concurrency": 32,
+        "split_prefix": False,
+    },
+}
+REQUEST_TIMEOUT = 600.0
+MAX_RETRIES = 6
+BACKOFF_BASE = 1.0
+BACKOFF_CAP = 60.0
+# latencies kept per (provider, model), and needed before hedging starts
+LATENCY_WINDOW = 1000
+MIN_HEDGE_SAMPLES = 50
+# successful calls to a model averaged into its latency baseline before latency can
+# signal congestion
+MIN_BASELINE_SAMPLES = 100
+
+
+class AdaptiveLimiter:
+    """
+    Additive-increase/multiplicative-decrease limit on the requests in flight to a
+    provider. Must be used from a single event loop.
+
+    Args:
+        initial: starting limit
+        max_limit: upper bound of the limit
+        min_limit: lower bound of the limit
+        decrease_factor: factor the limit is multiplied by on congestion
+        latency_factor: congestion is also signalled when the recent average latency
+            of a model's successful calls exceeds latency_factor times their long-run
+            average
+
+    Latencies are averaged per model, since the models behind a provider differ in
+    speed, and both averages are fed every successful call, so a lasting change in
+    latency (e.g. slower prompts) moves the baseline instead of holding the limit down.
+    """
+
+    def __init__(
+        self,
+        initial: int,
+        max_limit: int,
+        min_limit: int = 1,
+        decrease_factor: float = 0.5,
+        latency_factor: float = 3.0,
+    ):
+        self.limit = float(min(initial, max_limit))
+        self.max_limit = max_limit
+        self.min_limit = min_limit
+        self.decrease_factor = decrease_factor
+        self.latency_factor = latency_factor
+        self.in_flight = 0
+        self.resume_at = 0.0
+        # moving average of the latency of successful calls to any model
+        self.latency: Optional[float] = None
+        # model -> [moving averages of its latency over about the last 10 and the
+        # last 100 successful calls, number of calls]
+        self._model_latency: Dict[Optional[str], List[float]] = {}
+        self._last_decrease = 0.0
+        self._waiters: List[asyncio.Future] = []
+
+    async def acquire(self):
+        while True:
+            pause = self.resume_at - time.monotonic()
+            if pause > 0:
+                await asyncio.sleep(pause)
+                continue
+            if self.in_flight < int(self.limit):
+                self.in_flight += 1
+                return
+            waiter = asyncio.get_running_loop().create_future()
+            self._waiters.append(waiter)
+            await waiter
+
+    def _latency_increased(self, model: Optional[str], latency: float) -> bool:
+        # Adds a successful call's latency to the averages and returns whether the
+        # model's recent latency is more than latency_factor times its long-run latency.
+        self.latency = latency if self.latency is None else 0.9 * self.latency + 0.1 * latency
+        stats = self._model_latency.setdefault(model, [latency, latency, 0])
+        stats[2] += 1
+        n = stats[2]
+        # plain means until there are enough calls, so the first ones don't dominate
+        stats[0] += max(0.1, 1.0 / n) * (latency - stats[0])
+        stats[1] += max(0.01, 1.0 / n) * (latency - stats[1])
+        return n >= MIN_BASELINE_SAMPLES and stats[0] > self.latency_factor * stats[1]
+
+    def release(
+        self,
+        latency: Optional[float] = None,
+        congested: bool = False,
+        retry_after: Optional[float] = None,
+        model: Optional[str] = None,
+    ):
+        """
+        Frees a slot. latency is given for successful calls (to model), congested for
+        rate limits and timeouts; retry_after pauses all requests to the provider.
+        """
+        self.in_flight -= 1
+        now = time.monotonic()
+        if retry_after is not None:
+            self.resume_at = max(self.resume_at, now + retry_after)
+        if latency is not None and self._latency_increased(model, latency):
+            congested = True
+        if congested:
+            # the calls in flight when congestion starts all fail together, so decrease
+            # at most once per round trip
+            if now - self._last_decrease > (self.latency or 1.0):
+                self.limit = max(self.min_limit, self.limit * self.decrease_factor)
+                self._last_decrease = now
+        elif latency is not None:
+            # only grow a limit that is in use
+            if self.in_flight + 1 >= int(self.limit):
+                self.limit = min(self.max_limit, self.limit + 1.0 / self.limit)
+        waiters, self._waiters = self._waiters, []
+        for waiter in waiters:
+            if not waiter.done():
+                waiter.set_result(None)
+
+
+class LatencyTracker:
+    """
+    Latencies of the most recent successful calls to a model.
+    """
+
+    def __init__(self, window: int = LATENCY_WINDOW):
+        self._latencies = deque(maxlen=window)
+        self._sorted: List[float] = []
+        self._added = 0  # since the last sort
+
+    def add(self, latency: float):
+        self._latencies.append(latency)
+        self._added += 1
+
+    def percentile(self, q: float) -> Optional[float]:
+        """
+        Returns the q-th percentile (0-100) of the recent latencies, or None if there are
+        fewer than MIN_HEDGE_SAMPLES of them.
+        """
+        if len(self._latencies) < MIN_HEDGE_SAMPLES:
+            return None
+        # re-sort lazily, once about 2% of the window has changed
+        if len(self._sorted) < MIN_HEDGE_SAMPLES or self._added * 50 >= len(self._latencies):
+            self._sorted = sorted(self._latencies)
+            self._added = 0
+        return self._sorted[min(len(self._sorted) - 1, int(q / 100 * len(self._sorted)))]
+
+
+def retry_after_seconds(response) -> Optional[float]:
+    """
+    Returns the delay requested by a response's Retry-After header, if any.
+    """
+    if response is None:
+        return None
+    headers = response.headers
+    if headers.get("retry-after-ms") is not None:
+        try:
+            return float(headers["retry-after-ms"]) / 1000
+        except ValueError:
+            pass
+    value = headers.get("retry-after")
+    if value is None:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def backoff(attempt: int) -> float:
+    """
+    Exponential backoff with full jitter.
+    """
+    return random.uniform(0, min(BACKOFF_CAP, BACKOFF_BASE * 2**attempt))
+
+
+class ProviderPool:
+    """
+    Lazily created async clients and adaptive concurrency limits per provider. Clients
+    and limits are bound to the event loop they are first used on. With a cache,
+    requests are looked up there first and only misses are sent to the provider.
+
+    With hedge_percentile set, a request still running after that percentile (0-100)
+    of the model's recent latencies is duplicated, as long as the model's duplicates
+    stay within hedge_budget (a fraction of its requests). Latencies and budgets are
+    kept per (provider, model), so slow models don't use up the budget of fast ones.
+    """
+
+    def __init__(
+        self,
+        providers: Dict[str, dict] = PROVIDERS,
+        cache: Optional[ResponseCache] = None,
+        max_retries: int = MAX_RETRIES,
+        hedge_percentile: Optional[float] = None,
+        hedge_budget: float = 0.05,
+    ):
+        self.providers = {name: dict(config) for name, config in providers.items()}
+        self.cache = cache
+        self.max_retries = max_retries
+        self.hedge_percentile = hedge_percentile
+        self.hedge_budget = hedge_budget
+        self.requests = 0
+        self.hedges = 0
+        self.hedges_won = 0
+        self._clients = {}
+        self._limiters: Dict[str, AdaptiveLimiter] = {}
+        self._latencies: Dict[Tuple[str, str], LatencyTracker] = {}
+        # (provider, model) -> [requests, hedges]
+        self._hedge_counts: Dict[Tuple[str, str], List[int]] = {}
+
+    def configure(
+        self,
+        provider: str,
+        base_url: Optional[str] = None,
+        max_concurrency: Optional[int] = None,
+        split_prefix: Optional[bool] = None,
+    ):
+        """
+        Overrides the endpoint, the upper bound on concurrency or split_prefix (see
+        PROVIDERS) of a provider, e.g. to point it at a local mock server. Must be called
+        before the provider's first request.
+        """
+        if base_url is not None:
+            self.providers[provider]["base_url"] = base_url
+        if max_concurrency is not None:
+            self.providers[provider]["max_concurrency"] = max_concurrency
+        if split_prefix is not None:
+            self.providers[provider]["split_prefix"] = split_prefix
+
+    def client(self, provider: str):
+        if provider not in self._clients:
+            import httpx
+            import openai
+
+            config = self.providers[provider]
+            limit = config["max_concurrency"]
+            # keep one connection alive per allowed in-flight request
+            http_client = httpx.AsyncClient(
+                limits=httpx.Limits(max_connections=limit, max_keepalive_connections=limit),
+                timeout=REQUEST_TIMEOUT,
+            )
+            # retries are handled by the pool, so that they go through the limiter
+            self._clients[provider] = openai.AsyncOpenAI(
+                api_key=os.getenv(config["api_key_env"]),
+                base_url=config["base_url"],
+                http_client=http_client,
+                max_retries=0,
+            )
+        return self._clients[provider]
+
+    def limiter(self, provider: str) -> AdaptiveLimiter:
+        if provider not in self._limiters:
+            config = self.providers[provider]
+            self._limiters[provider] = AdaptiveLimiter(config["initial_concurrency"], config["max_concurrency"])
+        return self._limiters[provider]
+
+    def latencies(self, provider: str, model: str) -> LatencyTracker:
+        key = (provider, model)
+        if key not in self._latencies:
+            self._latencies[key] = LatencyTracker()
+        return self._latencies[key]
+
+    async def complete(self, provider: str, model: str, prompt: str, prefix: Optional[str] = None, **params) -> str:
+        """
+        Sends prompt as a single user message and returns the generated text.
+
+        With prefix, the message is prefix + prompt. For providers configured with
+        split_prefix, a non-empty prefix is sent as its own text part, so that it is a
+        separate, byte-identical block across requests; otherwise the message is a
+        single string, which server-side prefix caches match all the same.
+        """
+        if prefix and self.providers[provider].get("split_prefix"):
+            messages = [{"role": "user", "content": [
+                {"type": "text", "text": prefix},
+                {"type": "text", "text": prompt},
+            ]}]
+        else:
+            messages = [{"role": "user", "content": prompt if prefix is None else prefix + prompt}]
+        if self.cache is not None:
+            key = cache_key(provider, model, prompt if prefix is None else prefix + prompt, params)
+            cached = await self.cache.aget(key)
+            if cached is not None:
+                return cached
+        self.requests += 1
+        self._hedge_counts.setdefault((provider, model), [0, 0])[0] += 1
+        if self.hedge_percentile is None:
+            generation = await self._request(provider, model, messages, params)
+        else:
+            generation = await self._hedged_request(provider, model, messages, params)
+        if self.cache is not None and generation is not None:
+            await self.cache.aput(key, generation)
+        return generation
+
+    async def _request(
+        self, provider: str, model: str, messages: List[dict], params: dict, sent: Optional[asyncio.Event] = None
+    ) -> str:
+        import openai
+
+        limiter = self.limiter(provider)
+        for attempt in range(self.max_retries + 1):
+            await limiter.acquire()
+            if sent is not None:
+                sent.set()
+            start = time.monotonic()
+            try:
+                response = await self.client(provider).chat.completions.create(
+                    model=model,
+                    messages=messages,
+                    **params,
+                )
+            except openai.RateLimitError as e:
+                retry_after = retry_after_seconds(e.response)
+                limiter.release(congested=True, retry_after=retry_after)
+                error, delay = e, retry_after if retry_after is not None else backoff(attempt)
+            except openai.APITimeoutError as e:
+                limiter.release(congested=True)
+                error, delay = e, backoff(attempt)
+            except (openai.APIConnectionError, openai.InternalServerError) as e:
+                limiter.release(retry_after=retry_after_seconds(getattr(e, "response", None)))
+                error, delay = e, backoff(attempt)
+            except BaseException:
+                limiter.release()
+                raise
+            else:
+                latency = time.monotonic() - start
+                limiter.release(latency=latency, model=model)
+                self.latencies(provider, model).add(latency)
+                return response.choices[0].message.content
+            if attempt == self.max_retries:
+                raise error
+            await asyncio.sleep(delay)
+
+    async def _hedged_request(self, provider: str, model: str, messages: List[dict], params: dict) -> str:
+        sent = asyncio.Event()
+        tasks = [asyncio.ensure_future(self._request(provider, model, messages, params, sent))]
+        try:
+            # the hedge delay counts from when the request leaves the limiter's queue
+            tasks.append(asyncio.ensure_future(sent.wait()))
+            await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+            tasks.pop().cancel()
+            delay = self.latencies(provider, model).percentile(self.hedge_percentile)
+            if delay is not None and not tasks[0].done():
+                await asyncio.wait(tasks, timeout=delay)
+            counts = self._hedge_counts[(provider, model)]
+            if delay is None or tasks[0].done() or counts[1] >= self.hedge_budget * counts[0]:
+                return await tasks[0]
+
+            self.hedges += 1
+            counts[1] += 1
+            tasks.append(asyncio.ensure_future(self._request(provider, model, messages, params)))
+            pending = set(tasks)
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        if task is tasks[1]:
+                            self.hedges_won += 1
+                        return task.result()
+            # both failed
+            return tasks[0].result()
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    def hedge_stats(self) -> dict:
+        return {"requests": self.requests, "hedges": self.hedges, "hedges_won": self.hedges_won}
+
+    async def aclose(self):
+        for client in self._clients.values():
+            await client.close()
+        self._clients = {}
+        self._limiters = {}
+        self._latencies = {}
+        self._hedge_counts = {}
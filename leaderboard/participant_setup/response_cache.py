@@ -0,0 +1,207 @@
+"""Persistent, content-addressed cache of LLM responses.
+
+Responses are stored in a SQLite file under a hash of (provider, model, prompt,
+generation params), so reruns of a sweep (e.g. after fixing a scorer) reuse earlier
+generations instead of calling the provider again. The cache is bounded in size by
+evicting the least recently used responses, and can be shared by concurrent
+processes. aget() and aput() run the SQLite calls on a worker thread, for use from an
+event loop."""
+
+import argparse
+import asyncio
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from typing import Dict, Optional
+
+DEFAULT_CACHE_PATH = ".llm_response_cache.sqlite"
+# hits whose last-used times are held back and written together
+TOUCH_BATCH_SIZE = 256
+
+
+def cache_key(provider: str, model: str, prompt: str, params: dict) -> str:
+    """
+    Returns the content hash identifying a request.
+    """
+    request = {"provider": provider, "model": model, "prompt": prompt, "params": params}
+    return hashlib.sha256(json.dumps(request, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    """
+    SQLite-backed cache of generations keyed by cache_key.
+
+    Args:
+        path: the cache file
+        max_bytes: bound on the total size of the cached responses, None for unbounded
+        shared: allow other processes to read and write the file concurrently (WAL
+            journal); otherwise this process holds an exclusive lock on it
+    """
+
+    def __init__(self, path: str = DEFAULT_CACHE_PATH, max_bytes: Optional[int] = None, shared: bool = True):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        # key -> last-used time of hits not yet written, so lookups don't write
+        self._touched: Dict[str, float] = {}
+        self._conn = sqlite3.connect(path, timeout=30.0, check_same_thread=False, isolation_level=None)
+        if shared:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+        else:
+            self._conn.execute("PRAGMA locking_mode=EXCLUSIVE")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            "key TEXT PRIMARY KEY, response TEXT NOT NULL, "
+            "size INTEGER NOT NULL, last_used REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS responses_last_used ON responses (last_used)")
+        # running total of the response sizes, kept up to date by every write so that
+        # bounding the cache doesn't need a scan of the whole table
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS meta ("
+            "id INTEGER PRIMARY KEY CHECK (id = 0), total_size INTEGER NOT NULL)"
+        )
+        self._conn.execute(
+            "INSERT OR IGNORE INTO meta (id, total_size) "
+            "SELECT 0, COALESCE(SUM(size), 0) FROM responses"
+        )
+
+    def get(self, key: str) -> Optional[str]:
+        """
+        Returns the cached response for key, or None. The response's last-used time is
+        written with the next put, or once TOUCH_BATCH_SIZE hits are pending.
+        """
+        with self._lock:
+            row = self._conn.execute("SELECT response FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._touched[key] = time.time()
+            if len(self._touched) >= TOUCH_BATCH_SIZE:
+                self._conn.execute("BEGIN IMMEDIATE")
+                try:
+                    self._write_touched()
+                    self._conn.execute("COMMIT")
+                except BaseException:
+                    self._conn.execute("ROLLBACK")
+                    raise
+            return row[0]
+
+    async def aget(self, key: str) -> Optional[str]:
+        """
+        Like get, but runs on a worker thread instead of blocking the event loop.
+        """
+        return await asyncio.to_thread(self.get, key)
+
+    def _write_touched(self):
+        # Writes the pending last-used times inside the caller's transaction.
+        touched = [(used, key) for key, used in self._touched.items()]
+        self._touched = {}
+        self._conn.executemany("UPDATE responses SET last_used = max(last_used, ?) WHERE key = ?", touched)
+
+    def put(self, key: str, response: str) -> None:
+        """
+        Stores response under key, evicting the least recently used responses if the
+        cache grows beyond max_bytes.
+        """
+        size = len(response.encode("utf-8"))
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                # before evicting, so that recently read responses are kept
+                self._write_touched()
+                row = self._conn.execute("SELECT size FROM responses WHERE key = ?", (key,)).fetchone()
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO responses (key, response, size, last_used) VALUES (?, ?, ?, ?)",
+                    (key, response, size, time.time()),
+                )
+                total = self._add_size(size - (row[0] if row is not None else 0))
+                if self.max_bytes is not None and total > self.max_bytes:
+                    self._evict(total)
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    async def aput(self, key: str, response: str) -> None:
+        """
+        Like put, but runs on a worker thread instead of blocking the event loop.
+        """
+        await asyncio.to_thread(self.put, key, response)
+
+    def _add_size(self, delta: int) -> int:
+        # Updates the running total inside the caller's transaction and returns it.
+        self._conn.execute("UPDATE meta SET total_size = total_size + ? WHERE id = 0", (delta,))
+        return self._conn.execute("SELECT total_size FROM meta WHERE id = 0").fetchone()[0]
+
+    def _evict(self, total: int):
+        evicted = []
+        freed = 0
+        for key, size in self._conn.execute("SELECT key, size FROM responses ORDER BY last_used"):
+            if total - freed <= self.max_bytes:
+                break
+            evicted.append((key,))
+            freed += size
+        self._conn.executemany("DELETE FROM responses WHERE key = ?", evicted)
+        self._add_size(-freed)
+
+    def stats(self) -> dict:
+        """
+        Returns the hits and misses of this process, and the size of the cache.
+        """
+        with self._lock:
+            entries = self._conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+            size = self._conn.execute("SELECT total_size FROM meta WHERE id = 0").fetchone()[0]
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "entries": entries,
+            "bytes": size,
+        }
+
+    def clear(self) -> None:
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._conn.execute("DELETE FROM responses")
+                self._conn.execute("UPDATE meta SET total_size = 0 WHERE id = 0")
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def close(self) -> None:
+        with self._lock:
+            if self._touched:
+                self._conn.execute("BEGIN IMMEDIATE")
+                self._write_touched()
+                self._conn.execute("COMMIT")
+            self._conn.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Inspect or clear the LLM response cache')
+    parser.add_argument('--cache_path', default=DEFAULT_CACHE_PATH, type=str, help='Path of the cache file')
+    parser.add_argument('--clear', action='store_true', help='Delete all cached responses')
+
+    args = parser.parse_args()
+
+    cache = ResponseCache(args.cache_path)
+    if args.clear:
+        cache.clear()
+    stats = cache.stats()
+    print(f"{stats['entries']} responses, {stats['bytes'] / 2**20:.2f} MiB in {args.cache_path}")
+    cache.close()
+
+if __name__ == "__main__":
+    main()
+
+# invoke via python -m leaderboard.participant_setup.response_cache --cache_path <path of the cache file> [--clear]
@@ -0,0 +1,152 @@
+"""Write-ahead journal of completed generations, for resuming interrupted runs.
+
+Every generation is appended to a JSONL file as a (task, model, row, generation) record
+before it is returned to the evaluation. A restarted run loads the journal and only
+requests the rows that are missing from it. Each record is written with a single
+append and flushed to disk; a record cut short by a crash, and any line that does not
+parse, is skipped on load.
+
+A journal belongs to one run id and is kept in its own file, which one process at a time
+may hold open. Once the run finishes, finish() archives it, so the next run with that id
+starts from the first row instead of reusing its generations."""
+
+import asyncio
+import json
+import os
+import re
+import threading
+from typing import Dict, Optional, Tuple
+
+from utils import prompt_digest
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+DEFAULT_JOURNAL_PATH = ".run_journal.jsonl"
+
+
+def row_key(data: Optional[dict], *prompt_parts: str, params: Optional[dict] = None) -> str:
+    """
+    Identifies a row by its "index" column (if any), its prompt (given whole or in
+    parts) and the generation params, so that a row whose prompt or params changed is
+    generated again.
+    """
+    request = "".join(prompt_parts)
+    if params:
+        request += "\0" + json.dumps(params, sort_keys=True)
+    digest = prompt_digest(request).hex()
+    if data and data.get("index") is not None:
+        return f"{data['index']}:{digest}"
+    return digest
+
+
+def journal_path(path: str, run_id: str) -> str:
+    """
+    Returns the journal file of run_id, next to path.
+    """
+    root, ext = os.path.splitext(path)
+    return f"{root}.{re.sub(r'[^A-Za-z0-9_.-]', '_', run_id)}{ext}"
+
+
+class RunJournal:
+    """
+    Append-only journal of generations keyed by (task, model, row).
+
+    Args:
+        path: base name of the JSONL journal files; the run's file is created next to
+            it if missing (see journal_path)
+        run_id: the run being journaled, e.g. its task and model
+        fsync: flush every record to disk, so records also survive a power loss and
+            not only the process being killed
+    """
+
+    def __init__(self, path: str, run_id: str, fsync: bool = True):
+        self.path = journal_path(path, run_id)
+        self.run_id = run_id
+        self.fsync = fsync
+        self.records: Dict[Tuple[str, str, str], str] = {}
+        self._lock = threading.Lock()
+        self._fd = os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        if fcntl is not None:
+            try:
+                fcntl.flock(self._fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                os.close(self._fd)
+                raise RuntimeError(f"Journal {self.path} is in use by another run with id {run_id!r}")
+        valid_size = self._load()
+        # drop a record that was cut short, so that new records start on a fresh line
+        if os.fstat(self._fd).st_size > valid_size:
+            os.ftruncate(self._fd, valid_size)
+
+    def _load(self) -> int:
+        # Returns the size of the journal up to the end of its last complete line.
+        valid_size = 0
+        with open(self.path, "rb") as in_file:
+            for line in in_file:
+                if not line.endswith(b"\n"):
+                    break
+                valid_size += len(line)
+                try:
+                    record = json.loads(line)
+                    self.records[(record["task"], record["model"], record["row"])] = record["generation"]
+                except (ValueError, KeyError, TypeError):
+                    continue
+        return valid_size
+
+    def get(self, task: str, model: str, row: str) -> Optional[str]:
+        """
+        Returns the journaled generation of a row, or None if it has not been completed.
+        """
+        return self.records.get((task, model, row))
+
+    def _append(self, task: str, model: str, row: str, generation: str):
+        line = json.dumps({"task": task, "model": model, "row": row, "generation": generation}) + "\n"
+        with self._lock:
+            # one write on an O_APPEND descriptor, so concurrent records never interleave
+            os.write(self._fd, line.encode("utf-8"))
+            self.records[(task, model, row)] = generation
+
+    def record(self, task: str, model: str, row: str, generation: str):
+        """
+        Appends a completed generation and waits until it is on disk.
+        """
+        self._append(task, model, row, generation)
+        if self.fsync:
+            os.fsync(self._fd)
+
+    async def arecord(self, task: str, model: str, row: str, generation: str):
+        """
+        Like record, but flushes to disk on a worker thread instead of blocking the event loop.
+        """
+        self._append(task, model, row, generation)
+        if self.fsync:
+            await asyncio.to_thread(os.fsync, self._fd)
+
+    def completed(self, task: str, model: str) -> int:
+        """
+        Returns the number of journaled rows of a (task, model) run.
+        """
+        return sum(1 for t, m, _ in self.records if t == task and m == model)
+
+    def close(self):
+        os.close(self._fd)
+
+    def finish(self) -> Optional[str]:
+        """
+        Closes the journal of a run that has finished and moves it to <file>.done,
+        replacing an earlier archive. Returns the path of the archive, or None if the
+        file is gone or has been replaced by another one.
+        """
+        try:
+            own_file = os.path.samestat(os.fstat(self._fd), os.stat(self.path))
+        except FileNotFoundError:
+            own_file = False
+        archive_path = self.path + ".done"
+        if own_file:
+            # moved before the lock is released, so no other run opens it in between
+            os.replace(self.path, archive_path)
+        self.close()
+        self.records = {}
+        return archive_path if own_file else None
@@ -4,6 +4,10 @@ import weave
 from weave import Model
 import asyncio
 import argparse
+from prompt_registry import get_prompt
+# registers BatchedEvaluation, the class the leaderboard evaluations are published as
+import leaderboard.scorer.batched_evaluation
+from leaderboard.participant_setup.run_journal import DEFAULT_JOURNAL_PATH, RunJournal, row_key
 
 def main():
     parser = argparse.ArgumentParser(description='Submit a run for a single LegalBench task')
@@ -11,6 +15,9 @@ def main():
     parser.add_argument('--team', default='fuels', type=str, help='Weave team name')
     parser.add_argument('--project', default='legalbench-wandb', type=str, help='Weave project name')
     parser.add_argument('--model_name', type=str, help='Name you would like to show up on the leaderboard')
+    parser.add_argument('--journal', default=DEFAULT_JOURNAL_PATH, type=str, help='Base name of the journals of completed rows, from which an interrupted run resumes')
+    parser.add_argument('--run_id', type=str, help='Run whose journal is resumed (defaults to <task>-<model_name>); the journal is archived once the run finishes')
+    parser.add_argument('--no_journal', action='store_true', help='Start the run from the first row')
     
     args = parser.parse_args()
     
@@ -22,26 +29,47 @@ def main():
 
     dataset = weave.ref(f"{TASK}_test").get()
 
+    # Completed rows are journaled, so a restarted run only generates the missing ones
+    journal = None if args.no_journal else RunJournal(args.journal, args.run_id or f"{TASK}-{args.model_name}")
+
     class MyModel(Model):
         prompt_template: str
 
         @weave.op()
-        def predict(self, text: str):
+        def predict(self, text: str, index: int | None = None):
             prompt_template = self.prompt_template
 
             prompt = prompt_template.replace("{{text}}", text)
+            row = row_key({"index": index}, prompt)
+            if journal is not None:
+                generation = journal.get(TASK, self.name, row)
+                if generation is not None:
+                    return {'generation': generation}
+
+            # replace with a call to your LLM
+            generation = prompt
+            if journal is not None:
+                journal.record(TASK, self.name, row, generation)
             
-            return {'generation': prompt}
+            return {'generation': generation}
 
     # Load base prompt
-    with open(f"tasks/{TASK}/base_prompt.txt") as in_file:
-        prompt_template = in_file.read()
+    prompt_template = get_prompt(TASK, "base_prompt")
 
     model = MyModel(prompt_template=prompt_template, name=args.model_name)
 
     eval = weave.ref(f"{TASK}_evaluation").get()
 
-    asyncio.run(eval.evaluate(model))
+    try:
+        asyncio.run(eval.evaluate(model))
+    except BaseException:
+        if journal is not None:
+            journal.close()
+        raise
+    if journal is not None:
+        archive_path = journal.finish()
+        if archive_path is not None:
+            print(f"Run finished, journal archived to {archive_path}")
 
 if __name__ == "__main__":
     main()
@@ -1,13 +1,20 @@
 """This script exemplifies how to call an LLM across 
 all LegalBench tasks present in weave. Each task has its own
-leaderboard and the for-loop at the bottom iterates over all of them."""
+leaderboard and the loop at the bottom schedules an evaluation for every
+(task, model) pair; all of them run concurrently on a single event loop."""
 
 import weave
 from weave import Model
 import asyncio
-import openai
-import os
 import argparse
+from collections import defaultdict
+from utils import compile_template, prompt_digest
+from prompt_registry import get_prompt
+# registers BatchedEvaluation, the class the leaderboard evaluations are published as
+import leaderboard.scorer.batched_evaluation
+from leaderboard.participant_setup.providers import ProviderPool
+from leaderboard.participant_setup.response_cache import DEFAULT_CACHE_PATH, ResponseCache
+from leaderboard.participant_setup.run_journal import DEFAULT_JOURNAL_PATH, RunJournal, row_key
 
 TASKS = [
     "abercrombie",
@@ -18,10 +25,63 @@ TASKS = [
     "ssla_company_defendants",
 ]
 
+async def run_sweep(runs, pool: ProviderPool, prefix_order: bool = False):
+    """
+    Runs the evaluations of all (task, evaluation, model) runs concurrently. How many
+    requests are in flight is bounded by the per-provider limits of pool, so a sweep
+    is limited by provider throughput rather than by waiting on one run at a time.
+    Returns the result of each run, or the exception it failed with.
+
+    With prefix_order, the runs of each model are instead run one after another,
+    ordered by the prompt prefix before the first field, so that a model's requests
+    don't interleave prompts of different tasks and runs sharing a prefix follow each
+    other. Different models still run concurrently.
+    """
+    async def run(index):
+        _, evaluation, model = runs[index]
+        try:
+            results[index] = await evaluation.evaluate(model)
+        except Exception as e:
+            results[index] = e
+
+    async def run_lane(indices):
+        for index in indices:
+            await run(index)
+
+    results = [None] * len(runs)
+    if prefix_order:
+        lanes = defaultdict(list)
+        for index, (_, _, model) in enumerate(runs):
+            lanes[model.name].append(index)
+        for indices in lanes.values():
+            indices.sort(key=lambda index: compile_template(runs[index][2].prompt).literals[0])
+        coroutines = [run_lane(indices) for indices in lanes.values()]
+    else:
+        coroutines = [run(index) for index in range(len(runs))]
+    try:
+        await asyncio.gather(*coroutines)
+    finally:
+        await pool.aclose()
+    return results
+
 def main():
     parser = argparse.ArgumentParser(description='Submit runs for all LegalBench tasks')
     parser.add_argument('--team', default='fuels', type=str, help='Weave team name')
     parser.add_argument('--project', default='legalbench-wandb', type=str, help='Weave project name')
+    parser.add_argument('--tasks', nargs='*', default=TASKS, type=str, help='Tasks to evaluate')
+    parser.add_argument('--openai_base_url', type=str, help='Override the OpenAI endpoint, e.g. a local mock server')
+    parser.add_argument('--together_base_url', type=str, help='Override the Together endpoint')
+    parser.add_argument('--openai_concurrency', type=int, help='Upper bound on in-flight OpenAI requests, which adapt to rate limits below it')
+    parser.add_argument('--together_concurrency', type=int, help='Upper bound on in-flight Together requests (shared by all Together models)')
+    parser.add_argument('--hedge_percentile', type=float, help='Duplicate requests slower than this percentile (0-100) of recent latencies')
+    parser.add_argument('--hedge_budget', default=0.05, type=float, help='Maximum fraction of requests that are duplicated')
+    parser.add_argument('--cache_path', default=DEFAULT_CACHE_PATH, type=str, help='File in which responses are cached across runs')
+    parser.add_argument('--cache_max_mb', type=float, help='Bound on the size of the response cache in MiB')
+    parser.add_argument('--no_cache', action='store_true', help='Always call the providers')
+    parser.add_argument('--journal', default=DEFAULT_JOURNAL_PATH, type=str, help='Base name of the journals of completed rows, from which interrupted runs resume')
+    parser.add_argument('--run_id', type=str, help='Sweep whose journal is resumed (defaults to one per set of tasks); the journal is archived once every run has finished')
+    parser.add_argument('--no_journal', action='store_true', help='Start every run from the first row')
+    parser.add_argument('--prefix_order', action='store_true', help='Run each model\'s tasks one at a time in prompt prefix order, so that consecutive requests share their prefix for prefix caching')
     
     args = parser.parse_args()
     
@@ -38,16 +98,43 @@ def main():
     predictions. The user should replace the following section with
     their own custom model (=class)."""
 
-    # Set up OpenAI client (GPT‑4o‑mini)
-    openai_client = openai.OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+    # Responses of earlier runs are reused, so rerunning a sweep only pays for new requests
+    cache = None
+    if not args.no_cache:
+        max_bytes = int(args.cache_max_mb * 2**20) if args.cache_max_mb is not None else None
+        cache = ResponseCache(args.cache_path, max_bytes=max_bytes)
+
+    # Completed rows are journaled, so a restarted sweep only requests the missing ones
+    run_id = args.run_id or "sweep-" + prompt_digest(",".join(sorted(args.tasks))).hex()[:12]
+    journal = None if args.no_journal else RunJournal(args.journal, run_id)
+
+    # characters of prompt prefix shared by all rows of a task, and of whole prompts
+    prefix_chars = defaultdict(int)
+    prompt_chars = defaultdict(int)
 
-    # set up Together
-    TOGETHER_API_KEY = os.getenv("TOGETHER_API_KEY")
+    # generation params of every request
+    params = {"max_tokens": 1000, "temperature": 0.0}
 
-    together_client = openai.OpenAI(
-        api_key=TOGETHER_API_KEY,
-        base_url="https://api.together.xyz",
-    )
+    async def generate(task: str, model_name: str, data: dict | None, prefix: str | None, prompt: str, request) -> str:
+        if prefix is not None:
+            prefix_chars[task] += len(prefix)
+            prompt_chars[task] += len(prefix) + len(prompt)
+        row = row_key(data, *([prompt] if prefix is None else [prefix, prompt]), params=params)
+        if journal is not None:
+            generated_text = journal.get(task, model_name, row)
+            if generated_text is not None:
+                return generated_text
+        generated_text = await request()
+        if journal is not None:
+            await journal.arecord(task, model_name, row, generated_text)
+        return generated_text
+
+    # One async client per provider with pooled keep-alive connections, and an adaptive
+    # limit on the requests each provider has in flight across all running evaluations;
+    # rate-limited and transient failures are retried
+    pool = ProviderPool(cache=cache, hedge_percentile=args.hedge_percentile, hedge_budget=args.hedge_budget)
+    pool.configure("openai", base_url=args.openai_base_url, max_concurrency=args.openai_concurrency)
+    pool.configure("together", base_url=args.together_base_url, max_concurrency=args.together_concurrency)
 
     TOGETHER_MODELS = [
         "meta-llama/Llama-4-Maverick-17B-128E-Instruct-FP8",
@@ -62,25 +149,33 @@ def main():
         """GPT‑4o‑mini wrapper (unchanged)."""
 
         prompt: str
+        task: str
 
         def generate_prompt(self, template: str, data: dict) -> str:
-            prompt = template
-            for key, value in data.items():
-                placeholder = f"{{{{{key}}}}}"
-                prompt = prompt.replace(placeholder, str(value))
-            return prompt
+            return compile_template(template).render(data)
 
         @weave.op()
-        def predict(self, data: dict | None):
-            prompt_for_model = self.generate_prompt(self.prompt, data)
-
-            response = openai_client.chat.completions.create(
-                model="gpt-4o-mini",
-                messages=[{"role": "user", "content": prompt_for_model}],
-                max_tokens=1000,
-                temperature=0.0,
+        async def predict(self, data: dict | None):
+            if args.prefix_order:
+                # the prefix is the same string object for every row of the task
+                prefix, prompt_for_model = compile_template(self.prompt).render_parts(data or {})
+            else:
+                prefix, prompt_for_model = None, self.generate_prompt(self.prompt, data)
+
+            generated_text = await generate(
+                self.task,
+                self.name,
+                data,
+                prefix,
+                prompt_for_model,
+                lambda: pool.complete(
+                    "openai",
+                    "gpt-4o-mini",
+                    prompt_for_model,
+                    prefix=prefix,
+                    **params,
+                ),
             )
-            generated_text = response.choices[0].message.content
             return {"generation": generated_text}
 
 
@@ -88,47 +183,89 @@ def main():
         """Minimal Together AI wrapper – shares the same prompt logic."""
 
         prompt: str
+        task: str
         model_name: str  # full Together model id
 
         def generate_prompt(self, template: str, data: dict) -> str:
-            prompt = template
-            for key, value in (data or {}).items():
-                placeholder = f"{{{{{key}}}}}"
-                prompt = prompt.replace(placeholder, str(value))
-            return prompt
+            return compile_template(template).render(data or {})
 
         @weave.op()
-        def predict(self, data: dict | None):
-            prompt_for_model = self.generate_prompt(self.prompt, data)
-
-            response = together_client.chat.completions.create(
-                model=self.model_name,
-                messages=[{"role": "user", "content": prompt_for_model}],
-                max_tokens=1000,
-                temperature=0.0,
+        async def predict(self, data: dict | None):
+            if args.prefix_order:
+                # the prefix is the same string object for every row of the task
+                prefix, prompt_for_model = compile_template(self.prompt).render_parts(data or {})
+            else:
+                prefix, prompt_for_model = None, self.generate_prompt(self.prompt, data)
+
+            generated_text = await generate(
+                self.task,
+                self.name,
+                data,
+                prefix,
+                prompt_for_model,
+                lambda: pool.complete(
+                    "together",
+                    self.model_name,
+                    prompt_for_model,
+                    prefix=prefix,
+                    **params,
+                ),
             )
-            generated_text = response.choices[0].message.content
             return {"generation": generated_text}
 
 
-    for task in TASKS:
-        with open(f"tasks/{task}/base_prompt.txt") as in_file:
-            prompt_template = in_file.read()
+    runs = []
+    for task in args.tasks:
+        prompt_template = get_prompt(task, "base_prompt")
 
         eval = weave.ref(f"{task}_evaluation").get()
 
         # Evaluate GPT‑4o‑mini
-        model = MyModel5(name="gpt-4o-mini_base-prompt", prompt=prompt_template)
-        asyncio.run(eval.evaluate(model))
+        model = MyModel5(name="gpt-4o-mini_base-prompt", prompt=prompt_template, task=task)
+        runs.append((task, eval, model))
 
         # Evaluate the five Together models
         for together_id in TOGETHER_MODELS:
             together_model = MyTogetherModel(
                 name=f"{together_id.split('/')[-1]}_base-prompt",
                 prompt=prompt_template,
+                task=task,
                 model_name=together_id,
             )
-            asyncio.run(eval.evaluate(together_model))
+            runs.append((task, eval, together_model))
+
+    if journal is not None:
+        for task, _, model in runs:
+            completed = journal.completed(task, model.name)
+            if completed:
+                print(f"{task} / {model.name}: resuming, {completed} rows already completed")
+
+    try:
+        results = asyncio.run(run_sweep(runs, pool, prefix_order=args.prefix_order))
+    except BaseException:
+        if journal is not None:
+            journal.close()
+        raise
+    for (task, _, model), result in zip(runs, results):
+        if isinstance(result, Exception):
+            print(f"{task} / {model.name} failed: {result!r}")
+    for task in prompt_chars:
+        print(f"{task}: {prefix_chars[task] / prompt_chars[task]:.1%} of prompt characters in the shared prefix")
+    if args.hedge_percentile is not None:
+        stats = pool.hedge_stats()
+        print(f"Hedging: {stats['hedges']} of {stats['requests']} requests duplicated, {stats['hedges_won']} duplicates finished first")
+    if cache is not None:
+        stats = cache.stats()
+        print(f"Response cache: {stats['hits']} hits, {stats['misses']} misses, {stats['entries']} cached responses")
+        cache.close()
+    if journal is not None:
+        # keep the journal of a sweep with failed runs, so that rerunning it resumes them
+        if any(isinstance(result, Exception) for result in results):
+            journal.close()
+        else:
+            archive_path = journal.finish()
+            if archive_path is not None:
+                print(f"All runs finished, journal archived to {archive_path}")
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,268 @@
+"""Weave Evaluation that scores model outputs in blocks instead of one scorer call per row.
+
+weave.Evaluation applies every scorer to every row as its own op call, which for the
+LegalBench metrics costs far more than the metric itself. BatchedEvaluation only runs
+the model per row; scorers with a score_batch() method (LegalBenchScorer) score the
+outputs in blocks as they complete. Other scorers are applied per row as before.
+
+Each row's predict_and_score call waits until its block has been scored, so the traced
+rows carry their scores as with weave.Evaluation. A block is scored once it has
+score_block_size rows, or once every row in flight is waiting on it.
+
+Each scored block is also added to a SummaryAccumulator per scorer, so the task-level
+result so far can be read with partial_summary() while the evaluation is running.
+
+The class is registered with weave, so an evaluation published as a BatchedEvaluation
+is loaded as one by weave.ref(...).get() in any process that imports this module."""
+
+import asyncio
+import contextvars
+import logging
+import traceback
+from itertools import chain, repeat
+from typing import Dict, List, Optional, Tuple, Union
+
+from pydantic import PrivateAttr
+
+import weave
+from weave import Evaluation, Model
+from weave.flow import util
+from weave.flow.eval import EvaluationResults, is_valid_model, INVALID_MODEL_ERROR
+from weave.flow.util import transpose
+from weave.flow.model import ApplyModelError, apply_model_async
+from weave.flow.scorer import auto_summarize, get_scorer_attributes
+from weave.trace.env import get_weave_parallelism
+from weave.trace.objectify import register_object
+from weave.trace.op import Op, OpCallError
+
+from leaderboard.scorer.row_level_metrics import GOLD_COLUMNS
+from leaderboard.scorer.task_level_metrics import SummaryAccumulator
+
+logger = logging.getLogger(__name__)
+
+# rows scored per score_batch() call
+SCORE_BLOCK_SIZE = 64
+
+
+def is_batch_scorer(scorer) -> bool:
+    return hasattr(scorer, "score_batch")
+
+
+class _BlockScorer:
+    """
+    Gathers the rows of one get_eval_results run into blocks for
+    BatchedEvaluation._score_block. Rows wait in score() until their block is scored.
+    """
+
+    def __init__(self, evaluation: "BatchedEvaluation", summaries: Dict[str, SummaryAccumulator]):
+        self.evaluation = evaluation
+        self.summaries = summaries
+        # predict_and_score calls that have started and not returned
+        self.in_flight = 0
+        self.blocks_scored = 0
+        self._pending: List[Tuple[dict, dict, asyncio.Future]] = []
+
+    async def score(self, example: dict, eval_row: dict):
+        future = asyncio.get_running_loop().create_future()
+        self._pending.append((example, eval_row, future))
+        self.flush_if_ready()
+        await future
+
+    def flush_if_ready(self):
+        # the rows in flight that are not waiting may still join the block; once none
+        # are left, no other row can start until the block is scored
+        pending = self._pending
+        if pending and (len(pending) >= self.evaluation.score_block_size or len(pending) >= self.in_flight):
+            self._pending = []
+            try:
+                self.evaluation._score_block([(example, eval_row) for example, eval_row, _ in pending], self.summaries)
+            finally:
+                self.blocks_scored += 1
+                for _, _, future in pending:
+                    if not future.done():
+                        future.set_result(None)
+
+
+# block scorer of the get_eval_results run the current predict_and_score belongs to
+_block_scorer: contextvars.ContextVar[Optional[_BlockScorer]] = contextvars.ContextVar("block_scorer", default=None)
+
+
+class BatchedEvaluationResults(EvaluationResults):
+    """
+    EvaluationResults that also carry the summaries accumulated while scoring.
+    """
+
+    _summaries: Dict[str, SummaryAccumulator] = PrivateAttr(default_factory=dict)
+
+
+@register_object
+class BatchedEvaluation(Evaluation):
+    """
+    Evaluation that scores rows in blocks of up to score_block_size with the scorers'
+    score_batch(). Blocks are also bounded by the rows evaluated in parallel
+    (WEAVE_PARALLELISM). Row scores and summaries are the same as with Evaluation.
+    """
+
+    score_block_size: int = SCORE_BLOCK_SIZE
+
+    # model name -> scorer name -> accumulator of the rows scored so far
+    _summaries: Dict[str, Dict[str, SummaryAccumulator]] = PrivateAttr(default_factory=dict)
+
+    def partial_summary(self, model_name: str) -> Optional[dict]:
+        """
+        Returns the summary of each batch scorer over the rows of model_name's
+        evaluation scored so far, or None if it has not started.
+        """
+        summaries = self._summaries.get(model_name)
+        if summaries is None:
+            return None
+        return {scorer_name: summary.summary() for scorer_name, summary in summaries.items()}
+
+    @weave.op
+    async def predict_and_score(self, model: Union[Op, Model], example: dict) -> dict:
+        # Like Evaluation.predict_and_score, but batch scorers score the row together
+        # with other rows of the run, which this call waits for
+        block_scorer = _block_scorer.get()
+        if block_scorer is not None:
+            block_scorer.in_flight += 1
+        try:
+            apply_model_result = await apply_model_async(model, example, self.preprocess_model_input)
+
+            if isinstance(apply_model_result, ApplyModelError):
+                return {
+                    self._output_key: None,
+                    "scores": {},
+                    "model_latency": apply_model_result.model_latency,
+                }
+
+            scores = {}
+            for scorer in self.scorers or []:
+                if not is_batch_scorer(scorer):
+                    apply_scorer_result = await apply_model_result.model_call.apply_scorer(scorer, example)
+                    scores[get_scorer_attributes(scorer).scorer_name] = apply_scorer_result.result
+
+            eval_row = {
+                self._output_key: apply_model_result.model_output,
+                "scores": scores,
+                "model_latency": apply_model_result.model_latency,
+            }
+            if block_scorer is None:
+                self._score_block([(example, eval_row)], {})
+            else:
+                await block_scorer.score(example, eval_row)
+            return eval_row
+        finally:
+            if block_scorer is not None:
+                block_scorer.in_flight -= 1
+                block_scorer.flush_if_ready()
+
+    @weave.op()
+    async def summarize(self, eval_table: EvaluationResults) -> dict:
+        # Like Evaluation.summarize, but batch scorers are summarized by the accumulators
+        # fed while scoring instead of going over every score row again
+        summaries = getattr(eval_table, "_summaries", {})
+        summary = {}
+        for name, vals in transpose(list(eval_table.rows)).items():
+            if name == "scores":
+                score_tables = transpose(vals)
+                for scorer in self.scorers or []:
+                    scorer_attributes = get_scorer_attributes(scorer)
+                    scorer_name = scorer_attributes.scorer_name
+                    if scorer_name in summaries:
+                        summary[scorer_name] = summaries[scorer_name].summary()
+                    else:
+                        summary[scorer_name] = scorer_attributes.summarize_fn(score_tables[scorer_name])
+            else:
+                model_output_summary = auto_summarize(vals)
+                if model_output_summary:
+                    summary[name] = model_output_summary
+        return summary
+
+    def _score_block(self, block: List[Tuple[dict, dict]], summaries: Dict[str, SummaryAccumulator]):
+        # Scores a block of (example, eval_row) pairs in place with every batch scorer,
+        # and adds the scores to the scorer's summary.
+        block = [(example, eval_row) for example, eval_row in block if eval_row[self._output_key] is not None]
+        if not block:
+            return
+        outputs = [eval_row[self._output_key] for _, eval_row in block]
+        answers = [example["answer"] for example, _ in block]
+        gold = {
+            column: [example.get(column) for example, _ in block]
+            for column in GOLD_COLUMNS
+            if any(column in example for example, _ in block)
+        }
+        for scorer in self.scorers or []:
+            if not is_batch_scorer(scorer):
+                continue
+            scorer_name = get_scorer_attributes(scorer).scorer_name
+            try:
+                results = scorer.score_batch(outputs, answers, gold)
+            except Exception:
+                # score rows one at a time, so that one bad output only fails its own row
+                results = []
+                for i in range(len(block)):
+                    try:
+                        results.append(scorer.score_batch(
+                            outputs[i : i + 1], answers[i : i + 1], {k: v[i : i + 1] for k, v in gold.items()}
+                        )[0])
+                    except Exception:
+                        logger.info("Scoring failed")
+                        traceback.print_exc()
+                        results.append({})
+            for (_, eval_row), result in zip(block, results):
+                eval_row["scores"][scorer_name] = result
+            summaries.setdefault(scorer_name, SummaryAccumulator()).add_rows(results)
+
+    async def get_eval_results(self, model: Union[Op, Model]) -> EvaluationResults:
+        if not is_valid_model(model):
+            raise ValueError(INVALID_MODEL_ERROR)
+        eval_rows: List[Tuple[int, dict]] = []
+        model_name = getattr(model, "name", None) or type(model).__name__
+        summaries = self._summaries[model_name] = {}
+        block_scorer = _BlockScorer(self, summaries)
+        # inherited by the tasks async_foreach creates for the rows
+        token = _block_scorer.set(block_scorer)
+
+        async def eval_example(example: dict) -> dict:
+            try:
+                eval_row = await self.predict_and_score(model, example)
+            except OpCallError as e:
+                raise e
+            except Exception:
+                logger.info("Predict and score failed")
+                traceback.print_exc()
+                return {self._output_key: None, "scores": {}}
+            return eval_row
+
+        n_complete = 0
+        blocks_logged = 0
+        _rows = self.dataset.rows
+        num_rows = len(_rows) * self.trials
+
+        trial_rows = chain.from_iterable(repeat(_rows, self.trials))
+        try:
+            async for index, example, eval_row in util.async_foreach(
+                trial_rows, eval_example, get_weave_parallelism()
+            ):
+                n_complete += 1
+                logger.info(f"Evaluated {n_complete} of {num_rows} examples")
+                if eval_row is None:
+                    eval_row = {self._output_key: None, "scores": {}}
+                else:
+                    eval_row["scores"] = eval_row.get("scores", {})
+                if block_scorer.blocks_scored > blocks_logged:
+                    blocks_logged = block_scorer.blocks_scored
+                    logger.info(f"Summary after {n_complete} of {num_rows} examples: {self.partial_summary(model_name)}")
+                eval_rows.append((index, eval_row))
+        finally:
+            _block_scorer.reset(token)
+
+        for _, eval_row in eval_rows:
+            for scorer in self.scorers or []:
+                scorer_name = get_scorer_attributes(scorer).scorer_name
+                if scorer_name not in eval_row["scores"]:
+                    eval_row["scores"][scorer_name] = {}
+        eval_rows.sort(key=lambda x: x[0])
+        results = BatchedEvaluationResults(rows=weave.Table([eval_row for _, eval_row in eval_rows]))
+        results._summaries = summaries
+        return results
@@ -8,61 +8,57 @@ from evaluation import (
 )
 from leaderboard.scorer.row_level_metrics import (
     evaluate_exact_match,
+    evaluate_exact_match_batch,
     evaluate_sara_within_10pt,
+    evaluate_sara_within_10pt_batch,
     evaluate_successor_liability_f1_single_example,
+    evaluate_successor_liability_batch,
     evaluate_citation_open_single_example,
+    evaluate_citation_open_batch,
     evaluate_definition_extraction_single_row,
+    evaluate_definition_extraction_batch,
     evaluate_ssla_row
 )
-from leaderboard.scorer.task_level_metrics import (
-    plain_accuracy,
-    arithmetic_mean,
-    balanced_accuracy,
-    micro_f1
-    
-)
+from leaderboard.scorer.task_level_metrics import SummaryAccumulator
 
 class LegalBenchScorer(Scorer):
     task: str
 
     @weave.op()
-    async def score(self, output: dict | None, answer: str) -> Any:
+    async def score(
+        self,
+        output: dict | None,
+        answer: str,
+        gold_normalized_answer: str | None = None,
+        gold_stemmed_answers: list | None = None,
+        gold_answer_entities: list | None = None,
+        gold_target: float | None = None,
+    ) -> Any:
         """Scores the correctness of the predictions on a per-example basis.
         Selects the correct (row-level) metric depending on the task.
         Args:
-            - """
-        
-        if output is None:
-            raise ValueError("No model output to score")
-        
-        generation = output.get("generation")
-        if generation is None:
-            raise KeyError("Expected 'prediction' key in output dict")
-
-        task = self.task
-
-        if task in EXACT_MATCH_BALANCED_ACC_TASKS:
-            normalized_answer_em = normalize(answer, stem=False)
-            normalized_generation_em = normalize(generation, stem=False)
-            # adding normalized answer and generation separately to calculate balanced accuracy on class level in summarize() later
-            return {"exact_match": evaluate_exact_match(normalized_generation_em, normalized_answer_em), "normalized_answer": normalized_answer_em, "normalized_generation": normalized_generation_em, "task_level_metric": "balanced_accuracy"}
-        elif task == "sara_numeric":
-            return {"within_10pt": evaluate_sara_within_10pt(generation, answer), "task_level_metric": "arithmetic_mean"}
-        elif task == "successor_liability":
-            tp, fp, fn = evaluate_successor_liability_f1_single_example(generation, answer)
-            return {"tp": tp, "fp": fp, "fn": fn, "f1": 2 * tp / (2 * tp + fp + fn), "task_level_metric": "f1"}
-        elif task == "citation_prediction_open":
-            return {"correct": evaluate_citation_open_single_example(generation, answer), "task_level_metric": "plain_accuracy"}
-        elif task == "definition_extraction":
-            return {"correct": evaluate_definition_extraction_single_row(generation, answer), "task_level_metric": "plain_accuracy"}
-        elif task.startswith("ssla"):
-            tp, fp, fn = evaluate_ssla_row(generation, answer)
-            return {"tp": tp, "fp": fp, "fn": fn, "f1": 2 * tp / (2 * tp + fp + fn), "task_level_metric": "f1"}
-        elif task in MANUAL_EVAL_TASKS:
-            raise Exception("This task needs to be manually evaluated:", task)
-        else:
-            raise Exception(f"Unknown task: {task}")
-        
+            - gold_*: precomputed gold columns added at upload time (see
+              row_level_metrics.gold_columns); computed from answer when absent."""
+
+        return score_example(
+            self.task,
+            output_generation(output),
+            answer,
+            gold_normalized_answer,
+            gold_stemmed_answers,
+            gold_answer_entities,
+            gold_target,
+        )
+
+    @weave.op()
+    def score_batch(self, outputs: list, answers: list, gold: dict | None = None) -> list:
+        """Scores a block of examples at once with the batched row-level metrics.
+        Returns the same per-example dicts as score(), in order.
+        gold optionally maps gold column names to per-row values.
+        Used by BatchedEvaluation in place of one score() call per row."""
+
+        return score_examples(self.task, [output_generation(output) for output in outputs], answers, gold)
+
     @weave.op()
     def summarize(self, score_rows: list) -> dict | None:
         """
@@ -73,34 +69,90 @@ class LegalBenchScorer(Scorer):
         • balanced_accuracy   → rows have "exact_match": bool
         • arithmetic_mean     → rows have "within_10pt": 0/1
         • f1                  → rows have tp / fp / fn
+
+        BatchedEvaluation instead feeds a task_level_metrics.SummaryAccumulator
+        as blocks are scored, so partial results are available mid-run.
         """
 
-        if not score_rows:
-            return None
+        return SummaryAccumulator().add_rows(score_rows).summary()
+
+
+def output_generation(output: dict | None) -> str:
+    if output is None:
+        raise ValueError("No model output to score")
+
+    generation = output.get("generation")
+    if generation is None:
+        raise KeyError("Expected 'prediction' key in output dict")
+    return generation
+
+
+def f1_row(tp: int, fp: int, fn: int) -> dict:
+    return {"tp": tp, "fp": fp, "fn": fn, "f1": 2 * tp / (2 * tp + fp + fn), "task_level_metric": "f1"}
+
 
-        # Every row of a run has the same task_level_metric,
-        # so just read it off the first one.
-        metric_type = score_rows[0].get("task_level_metric")
-        if metric_type is None:
-            raise ValueError("No task_level_metric found in score rows")
+def score_example(
+    task: str,
+    generation: str,
+    answer: str,
+    gold_normalized_answer: str | None = None,
+    gold_stemmed_answers: list | None = None,
+    gold_answer_entities: list | None = None,
+    gold_target: float | None = None,
+) -> dict:
+    """
+    Row-level score of one example, with the single-example metrics.
+    """
 
-        # plain accuracy
-        if metric_type == "plain_accuracy":
-            return {"plain_accuracy": plain_accuracy(score_rows)}
+    if task in EXACT_MATCH_BALANCED_ACC_TASKS:
+        normalized_answer_em = normalize(answer, stem=False) if gold_normalized_answer is None else gold_normalized_answer
+        normalized_generation_em = normalize(generation, stem=False)
+        # adding normalized answer and generation separately to calculate balanced accuracy on class level in summarize() later
+        return {"exact_match": evaluate_exact_match(normalized_generation_em, normalized_answer_em), "normalized_answer": normalized_answer_em, "normalized_generation": normalized_generation_em, "task_level_metric": "balanced_accuracy"}
+    elif task == "sara_numeric":
+        return {"within_10pt": evaluate_sara_within_10pt(generation, answer, gold_target), "task_level_metric": "arithmetic_mean"}
+    elif task == "successor_liability":
+        return f1_row(*evaluate_successor_liability_f1_single_example(generation, answer))
+    elif task == "citation_prediction_open":
+        return {"correct": evaluate_citation_open_single_example(generation, answer, gold_normalized_answer), "task_level_metric": "plain_accuracy"}
+    elif task == "definition_extraction":
+        return {"correct": evaluate_definition_extraction_single_row(generation, answer, gold_stemmed_answers), "task_level_metric": "plain_accuracy"}
+    elif task.startswith("ssla"):
+        return f1_row(*evaluate_ssla_row(generation, answer, gold_answer_entities))
+    elif task in MANUAL_EVAL_TASKS:
+        raise Exception("This task needs to be manually evaluated:", task)
+    else:
+        raise Exception(f"Unknown task: {task}")
 
-        # arithmetic mean
-        elif metric_type == "arithmetic_mean":
-            return {"arithmetic_mean": arithmetic_mean(score_rows)}
 
-        # balanced accuracy
-        elif metric_type == "balanced_accuracy":
-            return {"balanced_accuracy": balanced_accuracy(score_rows)}
+def score_examples(task: str, generations: list, answers: list, gold: dict | None = None) -> list:
+    """
+    Row-level scores of a block of examples, with the batched metrics. Returns the same
+    dicts as score_example() on each example.
+    """
 
-        # micro-F1
-        elif metric_type == "f1":
-            tp_total, fp_total, fn_total, micro_f1_total = micro_f1(score_rows)
-            return {"tp": tp_total, "fp": fp_total, "fn": fn_total, "f1": micro_f1_total}
+    gold = gold or {}
+    if len(generations) != len(answers):
+        raise ValueError(f"Got {len(generations)} outputs but {len(answers)} answers")
 
-        # unknown metric
-        else:
-            raise ValueError(f"Unrecognised task_level_metric: {metric_type}")
+    if task in EXACT_MATCH_BALANCED_ACC_TASKS:
+        matches, normalized_answers, normalized_generations = evaluate_exact_match_batch(generations, answers, gold.get("gold_normalized_answer"))
+        return [
+            {"exact_match": match, "normalized_answer": normalized_answer_em, "normalized_generation": normalized_generation_em, "task_level_metric": "balanced_accuracy"}
+            for match, normalized_answer_em, normalized_generation_em in zip(matches, normalized_answers, normalized_generations)
+        ]
+    elif task == "sara_numeric":
+        return [{"within_10pt": within, "task_level_metric": "arithmetic_mean"} for within in evaluate_sara_within_10pt_batch(generations, answers, gold.get("gold_target"))]
+    elif task == "successor_liability":
+        return [f1_row(*counts) for counts in evaluate_successor_liability_batch(generations, answers)]
+    elif task == "citation_prediction_open":
+        return [{"correct": correct, "task_level_metric": "plain_accuracy"} for correct in evaluate_citation_open_batch(generations, answers, gold.get("gold_normalized_answer"))]
+    elif task == "definition_extraction":
+        return [{"correct": correct, "task_level_metric": "plain_accuracy"} for correct in evaluate_definition_extraction_batch(generations, answers, gold.get("gold_stemmed_answers"))]
+    elif task.startswith("ssla"):
+        entities = gold.get("gold_answer_entities") or [None] * len(answers)
+        return [f1_row(*evaluate_ssla_row(g, a, e)) for g, a, e in zip(generations, answers, entities)]
+    elif task in MANUAL_EVAL_TASKS:
+        raise Exception("This task needs to be manually evaluated:", task)
+    else:
+        raise Exception(f"Unknown task: {task}")
@@ -1,7 +1,25 @@
 import re
 from evaluation import (
-    normalize
+    EXACT_MATCH_BALANCED_ACC_TASKS,
+    normalize,
+    normalize_batch,
+    definition_extraction_correct,
+    successor_liability_counts,
+    successor_liability_batch_counts,
+    extract_first_numbers,
+    within_10pt,
+    DefinitionExtractionScorer,
+    stemmed_answer_set
 )
+from matching import greedy_match
+
+# Optional dataset columns with precomputed gold answers, see gold_columns().
+GOLD_COLUMNS = [
+    "gold_normalized_answer",
+    "gold_stemmed_answers",
+    "gold_answer_entities",
+    "gold_target",
+]
 
 def evaluate_exact_match(output: dict, answer: str):
     """
@@ -11,17 +29,19 @@ def evaluate_exact_match(output: dict, answer: str):
 
     return answer == output
 
-def evaluate_sara_within_10pt(output: str, answer: str) -> int:
+def evaluate_sara_within_10pt(output: str, answer: str, target: float | None = None) -> int:
     """
     [Evaluates single example, implementation borrowed from evaluation.py]
     Return 1 if the first number in *output* is within ±10 % of *answer*, else 0.
+    target can be passed in if the answer was parsed beforehand.
     """
 
     sentence = str(output).replace(",", "").replace(".", "")
     m = re.search(r"\d+", sentence)
 
     prediction: float = float(m.group()) if m else 0.0
-    target: float = float(answer.replace("$", ""))
+    if target is None:
+        target = parse_sara_target(answer)
 
     correct = abs(prediction / (target + 1e-1) - 1.0) < 0.1
     return int(correct)
@@ -31,78 +51,130 @@ def evaluate_successor_liability_f1_single_example(output: str, answer: str):
     [Evaluates single example, implementation borrowed from evaluation.py]
     For successor liability, we measure F1 over the predicted exceptions.
     """
-    CLASSES = [
-        "express agreement",
-        "fraudulent conveyance",
-        "de facto merger",
-        "mere continuation",
-    ]
-    tp, fp, fn = 0, 0, 0
-    predictions = [c for c in CLASSES if c in str(output)]
-    sample_answers = str(answer).split(",")
-
-    for j in range(len(predictions)):
-        if predictions[j] in sample_answers:
-            index = sample_answers.index(predictions[j])
-            del sample_answers[index]
-            tp += 1
-        else:
-            fp += 1
-    fn += len(sample_answers)
-    return tp, fp, fn # return raw results for calculating micro-f1 both per row and later for entire task
-
-def evaluate_citation_open_single_example(output: str, answer: str):
+    return successor_liability_counts(output, answer) # return raw results for calculating micro-f1 both per row and later for entire task
+
+def evaluate_citation_open_single_example(output: str, answer: str, normalized_answer: str | None = None):
     """
     Example-level correctness for the open-citation task.
     Returns 1.0 if the (normalized) gold case name appears anywhere
     in the (normalized) generation; else 0.0.
+    normalized_answer can be passed in if the gold case name was normalized beforehand.
     """
 
-    normalized_answer = normalize(answer, stem=False)
+    if normalized_answer is None:
+        normalized_answer = normalize(answer, stem=False)
     normalized_output = normalize(output, stem=False)
     
     return 1.0 if normalized_answer in normalized_output else 0.0
 
-def evaluate_definition_extraction_single_row(output: str, answer: str):
+def evaluate_definition_extraction_single_row(output: str, answer: str, stemmed_answers: list | None = None):
     """
-    desc
+    [Evaluates single example, implementation borrowed from evaluation.py]
+    Returns 1.0 if any stemmed fragment of the output matches a stemmed gold answer; else 0.0.
+    stemmed_answers can be passed in if the gold answers were stemmed beforehand.
     """
 
-    answers_list = answer.split(",")
-    generations_list = output.split(",")
-    normalized_answers = [normalize(a, stem=True) for a in answers_list]
-    normalized_outputs = [normalize(g, stem=True) for g in generations_list]
+    if stemmed_answers is None:
+        return float(definition_extraction_correct(output, answer))
+    normalized_outputs = normalize_batch(output.split(","), stem=True)
+    return float(not frozenset(stemmed_answers).isdisjoint(normalized_outputs))
 
-    for gen in normalized_outputs:
-        if gen in normalized_answers:
-            return 1.0
-    return 0.0
-
-def evaluate_ssla_row(output: str, answer: str):
+def evaluate_ssla_row(output: str, answer: str, normalized_answers: list | None = None):
     """
     Row-level TP / FP / FN for the SSLA tasks.
     Mirrors the benchmark’s logic exactly, just scoped to one example.
+    normalized_answers can be passed in if the gold entities were normalized beforehand.
     """
 
-    answers_split = answer.split(",")
     outputs_split = str(output).split(",")
 
-    normalized_answers = [normalize(a, stem=False) for a in answers_split]
-    normalized_outputs = [normalize(g, stem=False) for g in outputs_split]
-
-    tp = fp = fn = 0
-
-    for a in normalized_answers:
-        found = False
-        for j, g in enumerate(normalized_outputs):
-            if a in g:
-                tp += 1
-                found = True
-                break
-        if found:
-            del normalized_outputs[j]
-        else:
-            fn += 1
-
-    fp += len(normalized_outputs)
-    return tp, fp, fn
\ No newline at end of file
+    if normalized_answers is None:
+        normalized_answers = normalize_batch(answer.split(","), stem=False)
+    normalized_outputs = normalize_batch(outputs_split, stem=False)
+
+    matches = greedy_match(normalized_answers, normalized_outputs)
+    tp = sum(match is not None for match in matches)
+    fn = len(matches) - tp
+    fp = len(normalized_outputs) - tp
+    return tp, fp, fn
+
+
+def _with_gold(values: list, gold: list | None, compute) -> list:
+    # Use precomputed gold values where present, computing the missing ones.
+    if gold is None:
+        return compute(values)
+    missing = [v for v, g in zip(values, gold) if g is None]
+    if not missing:
+        return list(gold)
+    computed = iter(compute(missing))
+    return [next(computed) if g is None else g for g in gold]
+
+def evaluate_exact_match_batch(outputs: list, answers: list, gold_normalized_answers: list | None = None):
+    """
+    [Evaluates a batch of examples]
+    Returns the exact-match results and the normalized answers and outputs, normalizing
+    each distinct string only once.
+    """
+
+    normalized_answers = _with_gold(answers, gold_normalized_answers, lambda a: normalize_batch(a, stem=False))
+    normalized_outputs = normalize_batch(outputs, stem=False)
+    matches = [evaluate_exact_match(o, a) for o, a in zip(normalized_outputs, normalized_answers)]
+    return matches, normalized_answers, normalized_outputs
+
+def evaluate_sara_within_10pt_batch(outputs: list, answers: list, gold_targets: list | None = None) -> list:
+    """
+    [Evaluates a batch of examples, vectorized version of evaluate_sara_within_10pt]
+    """
+
+    import numpy as np
+
+    targets = _with_gold(answers, gold_targets, lambda a: [parse_sara_target(x) for x in a])
+    targets = np.array(targets, dtype=np.float64)
+    return within_10pt(extract_first_numbers(outputs), targets).astype(int).tolist()
+
+def evaluate_successor_liability_batch(outputs: list, answers: list) -> list:
+    """
+    [Evaluates a batch of examples, batched version of evaluate_successor_liability_f1_single_example]
+    """
+
+    return successor_liability_batch_counts(outputs, answers)
+
+def evaluate_citation_open_batch(outputs: list, answers: list, gold_normalized_answers: list | None = None) -> list:
+    """
+    [Evaluates a batch of examples, batched version of evaluate_citation_open_single_example]
+    """
+
+    normalized_answers = _with_gold(answers, gold_normalized_answers, lambda a: normalize_batch(a, stem=False))
+    normalized_outputs = normalize_batch(outputs, stem=False)
+    return [1.0 if a in o else 0.0 for o, a in zip(normalized_outputs, normalized_answers)]
+
+def evaluate_definition_extraction_batch(outputs: list, answers: list, gold_stemmed_answers: list | None = None) -> list:
+    """
+    [Evaluates a batch of examples, batched version of evaluate_definition_extraction_single_row]
+    """
+
+    return [float(c) for c in DefinitionExtractionScorer(answers, gold_stemmed_answers).score(outputs)]
+
+def parse_sara_target(answer: str) -> float:
+    """
+    Parses a sara_numeric gold answer such as "$27181" into a number.
+    """
+
+    return float(answer.replace("$", ""))
+
+def gold_columns(task: str, answers: list) -> dict:
+    """
+    Gold answers of a task in the form the row-level metrics compare against, as extra
+    dataset columns (see GOLD_COLUMNS). Materialized once when the dataset is uploaded,
+    so the scorer doesn't redo this work on every row of every run.
+    """
+
+    if task in EXACT_MATCH_BALANCED_ACC_TASKS or task == "citation_prediction_open":
+        return {"gold_normalized_answer": normalize_batch(answers, stem=False)}
+    elif task == "definition_extraction":
+        return {"gold_stemmed_answers": [sorted(stemmed_answer_set(a)) for a in answers]}
+    elif task.startswith("ssla"):
+        return {"gold_answer_entities": [normalize_batch(a.split(","), stem=False) for a in answers]}
+    elif task == "sara_numeric":
+        return {"gold_target": [parse_sara_target(a) for a in answers]}
+    return {}
@@ -1,24 +1,105 @@
-from sklearn.metrics import balanced_accuracy_score
-
-def plain_accuracy(score_rows):
-    correct = [row["correct"] for row in score_rows if "correct" in row]
-    plain_accuracy = sum(correct) / len(correct) if correct else 0.0
-    return plain_accuracy
-
-def arithmetic_mean(score_rows):
-    within = [row["within_10pt"] for row in score_rows if "within_10pt" in row]
-    arithmetic_mean = sum(within) / len(within) if within else 0.0
-    return arithmetic_mean
-
-def balanced_accuracy(score_rows):
-    gold = [row["normalized_answer"]     for row in score_rows]
-    pred = [row["normalized_generation"] for row in score_rows]
-    return balanced_accuracy_score(gold, pred)
-
-def micro_f1(score_rows):
-    tp_total = sum(row.get("tp", 0) for row in score_rows)
-    fp_total = sum(row.get("fp", 0) for row in score_rows)
-    fn_total = sum(row.get("fn", 0) for row in score_rows)
-    denom = 2 * tp_total + fp_total + fn_total
-    micro_f1 = (2 * tp_total / denom) if denom else 0.0
-    return tp_total, fp_total, fn_total, micro_f1
\ No newline at end of file
+from evaluation import (
+    AccuracyAccumulator,
+    BalancedAccuracyAccumulator,
+    F1Accumulator,
+    accumulator_from_state,
+    merge_states,
+)
+
+# score-row key counted by each accuracy-style task_level_metric
+ACCURACY_KEYS = {"plain_accuracy": "correct", "arithmetic_mean": "within_10pt"}
+
+
+class SummaryAccumulator:
+    """
+    Incremental version of LegalBenchScorer.summarize: feed score rows in blocks as they
+    are produced and call summary() at any point for the task-level result so far.
+    Each block is reduced column-wise into confusion counts (balanced accuracy),
+    tp / fp / fn totals (f1) or hit counts (plain accuracy, arithmetic mean).
+    Empty rows (examples that failed to score) are skipped.
+    """
+
+    def __init__(self):
+        self.metric_type = None
+        self.accumulator = None
+
+    def add_rows(self, score_rows) -> "SummaryAccumulator":
+        score_rows = [row for row in score_rows if row]
+        if not score_rows:
+            return self
+        if self.metric_type is None:
+            # Every row of a run has the same task_level_metric,
+            # so just read it off the first one.
+            metric_type = score_rows[0].get("task_level_metric")
+            if metric_type is None:
+                raise ValueError("No task_level_metric found in score rows")
+            if metric_type == "balanced_accuracy":
+                self.accumulator = BalancedAccuracyAccumulator()
+            elif metric_type == "f1":
+                self.accumulator = F1Accumulator()
+            elif metric_type in ACCURACY_KEYS:
+                self.accumulator = AccuracyAccumulator()
+            else:
+                raise ValueError(f"Unrecognised task_level_metric: {metric_type}")
+            self.metric_type = metric_type
+
+        accumulator = self.accumulator
+        if self.metric_type == "balanced_accuracy":
+            accumulator.update_normalized(
+                [row["normalized_generation"] for row in score_rows],
+                [row["normalized_answer"] for row in score_rows],
+            )
+        elif self.metric_type == "f1":
+            accumulator.add_counts(
+                sum(row.get("tp", 0) for row in score_rows),
+                sum(row.get("fp", 0) for row in score_rows),
+                sum(row.get("fn", 0) for row in score_rows),
+            )
+        else:
+            key = ACCURACY_KEYS[self.metric_type]
+            values = [row[key] for row in score_rows if key in row]
+            accumulator.add_counts(sum(values), len(values))
+        return self
+
+    def summary(self) -> dict | None:
+        """
+        Returns the same dict as LegalBenchScorer.summarize on all rows added so far.
+        """
+        accumulator = self.accumulator
+        if accumulator is None:
+            return None
+        if self.metric_type == "balanced_accuracy":
+            return {"balanced_accuracy": accumulator.result()}
+        elif self.metric_type == "f1":
+            denom = 2 * accumulator.tp + accumulator.fp + accumulator.fn
+            micro_f1 = (2 * accumulator.tp / denom) if denom else 0.0
+            return {"tp": accumulator.tp, "fp": accumulator.fp, "fn": accumulator.fn, "f1": micro_f1}
+        else:
+            value = accumulator.result() if accumulator.total else 0.0
+            return {self.metric_type: value}
+
+    def state(self) -> dict | None:
+        """
+        Mergeable state of the rows added so far, or None if there are none.
+        """
+        return None if self.accumulator is None else self.accumulator.state()
+
+
+def metric_state(score_rows):
+    """
+    Mergeable state (see evaluation.MetricAccumulator.state) of the task-level metric
+    for a list of LegalBenchScorer score rows, so partial runs can be combined.
+    Returns None if there are no scored rows.
+    """
+    return SummaryAccumulator().add_rows(score_rows).state()
+
+
+def metric_from_states(states):
+    """
+    Merges states produced by metric_state() and returns the task-level metric, or
+    None if none of the states has scored rows.
+    """
+    states = [state for state in states if state is not None]
+    if not states:
+        return None
+    return accumulator_from_state(merge_states(states)).result()
@@ -0,0 +1,60 @@
+"""Multi-pattern substring matching used by the SSLA and successor_liability metrics."""
+
+from bisect import bisect_right
+from typing import Dict, List, Optional, Sequence
+
+# Joins texts into a single buffer. Patterns containing it are matched text by text.
+SEPARATOR = "\x00"
+
+
+def find_patterns(patterns: Sequence[str], texts: Sequence[str]) -> List[List[int]]:
+    """
+    For each pattern, returns the sorted indices of the texts that contain it.
+
+    The texts are joined into one buffer so that each pattern is located with a single
+    str.find scan per occurrence, instead of one `in` check per (pattern, text) pair.
+    """
+    buffer = SEPARATOR.join(texts)
+    starts = []
+    offset = 0
+    for text in texts:
+        starts.append(offset)
+        offset += len(text) + len(SEPARATOR)
+
+    hits: Dict[str, List[int]] = {}
+    for pattern in patterns:
+        if pattern in hits:
+            continue
+        if not pattern or SEPARATOR in pattern:
+            hits[pattern] = [i for i, text in enumerate(texts) if pattern in text]
+            continue
+        text_ids = []
+        position = buffer.find(pattern)
+        while position != -1:
+            text_id = bisect_right(starts, position) - 1
+            text_ids.append(text_id)
+            # Only containment matters, so resume at the start of the next text.
+            if text_id + 1 == len(starts):
+                break
+            position = buffer.find(pattern, starts[text_id + 1])
+        hits[pattern] = text_ids
+    return [hits[p] for p in patterns]
+
+
+def greedy_match(patterns: Sequence[str], texts: Sequence[str]) -> List[Optional[int]]:
+    """
+    Matches patterns to texts one-to-one: in pattern order, each pattern takes the first
+    not-yet-taken text that contains it. Returns the index of the matched text for each
+    pattern, or None if it matched nothing.
+
+    This is equivalent to scanning the remaining texts for every pattern and deleting
+    the matched one, without rescanning or shifting the list of texts.
+    """
+    taken = set()
+    matches = []
+    for text_ids in find_patterns(patterns, texts):
+        match = next((i for i in text_ids if i not in taken), None)
+        if match is not None:
+            taken.add(match)
+        matches.append(match)
+    return matches
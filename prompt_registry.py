@@ -0,0 +1,157 @@
+"""
+Registry of the prompt templates stored under tasks/<task>/*prompt*.txt.
+
+The registry indexes every (task, variant) pair once, reads and parses each template on
+first access, and can be snapshotted into a single bundle file that later runs load
+instead of reading hundreds of small files:
+
+    from prompt_registry import get_prompt
+    prompt_template = get_prompt("abercrombie", "base_prompt")
+
+    python prompt_registry.py --bundle prompts_bundle.json
+"""
+
+import argparse
+import json
+import os
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple
+
+from utils import PromptTemplate, compile_template
+
+TASKS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "tasks")
+DEFAULT_VARIANT = "base_prompt"
+BUNDLE_VERSION = 1
+
+
+class PromptRegistry:
+    """
+    Prompt templates keyed by (task, variant), where variant is the file name without
+    ".txt" (e.g. "base_prompt", "claude_prompt", "rule_description_prompt").
+    """
+
+    def __init__(self, tasks_dir: str = TASKS_DIR, texts: Dict[Tuple[str, str], str] = None):
+        self.tasks_dir = tasks_dir
+        self._paths: Optional[Dict[Tuple[str, str], str]] = None
+        self._texts: Dict[Tuple[str, str], str] = dict(texts or {})
+        if texts is not None:
+            self._paths = {key: None for key in texts}
+
+    @classmethod
+    def from_bundle(cls, path: str) -> "PromptRegistry":
+        """
+        Loads a registry snapshot written by save_bundle.
+        """
+        with open(path) as in_file:
+            bundle = json.load(in_file)
+        if bundle.get("version") != BUNDLE_VERSION:
+            raise ValueError(f"Unsupported prompt bundle version: {bundle.get('version')}")
+        texts = {
+            (task, variant): text
+            for task, variants in bundle["prompts"].items()
+            for variant, text in variants.items()
+        }
+        return cls(texts=texts)
+
+    def _index(self) -> Dict[Tuple[str, str], str]:
+        if self._paths is None:
+            paths = {}
+            for task in sorted(os.listdir(self.tasks_dir)):
+                task_dir = os.path.join(self.tasks_dir, task)
+                if not os.path.isdir(task_dir):
+                    continue
+                for name in sorted(os.listdir(task_dir)):
+                    if name.endswith(".txt") and "prompt" in name:
+                        paths[(task, name[: -len(".txt")])] = os.path.join(task_dir, name)
+            self._paths = paths
+        return self._paths
+
+    def variants(self, task: str) -> List[str]:
+        """
+        Returns the prompt variants available for task.
+        """
+        return [variant for t, variant in self._index() if t == task]
+
+    def keys(self) -> List[Tuple[str, str]]:
+        return list(self._index())
+
+    def get(self, task: str, variant: str = DEFAULT_VARIANT) -> str:
+        """
+        Returns the raw text of a prompt template.
+        """
+        key = (task, variant)
+        if key not in self._texts:
+            paths = self._index()
+            if key not in paths:
+                raise KeyError(f"No prompt {variant} for task {task}")
+            with open(paths[key]) as in_file:
+                self._texts[key] = in_file.read()
+        return self._texts[key]
+
+    def template(self, task: str, variant: str = DEFAULT_VARIANT) -> PromptTemplate:
+        """
+        Returns the parsed template of a prompt.
+        """
+        return compile_template(self.get(task, variant))
+
+    def validate(self, task: str, variant: str = DEFAULT_VARIANT, columns: List[str] = None) -> None:
+        """
+        Raises a ValueError if the prompt uses a field that is not a column of the task.
+        Columns default to those recorded in the task catalog.
+        """
+        if columns is None:
+            from task_catalog import get_task_info
+
+            columns = get_task_info(task)["columns"]
+            if columns is None:
+                return
+        self.template(task, variant).validate(columns)
+
+    def save_bundle(self, path: str) -> None:
+        """
+        Writes every prompt of the registry into a single file for fast startup.
+        """
+        prompts: Dict[str, Dict[str, str]] = {}
+        for task, variant in self.keys():
+            prompts.setdefault(task, {})[variant] = self.get(task, variant)
+        with open(path, "w") as out_file:
+            json.dump({"version": BUNDLE_VERSION, "prompts": prompts}, out_file)
+
+
+@lru_cache(maxsize=None)
+def get_registry() -> PromptRegistry:
+    """
+    Returns the process-wide registry. Set LEGALBENCH_PROMPT_BUNDLE to load it from a bundle.
+    """
+    bundle = os.environ.get("LEGALBENCH_PROMPT_BUNDLE")
+    if bundle:
+        return PromptRegistry.from_bundle(bundle)
+    return PromptRegistry()
+
+
+def get_prompt(task: str, variant: str = DEFAULT_VARIANT) -> str:
+    """
+    Returns the text of the prompt template variant for task.
+    """
+    return get_registry().get(task, variant)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Validate and bundle LegalBench prompt templates")
+    parser.add_argument("--bundle", type=str, help="Path to write a bundle of all prompts to")
+
+    args = parser.parse_args()
+
+    registry = PromptRegistry()
+    for task, variant in registry.keys():
+        try:
+            registry.validate(task, variant)
+        except (AssertionError, ValueError) as e:
+            print(f"{task}/{variant}: {e}")
+    if args.bundle is not None:
+        registry.save_bundle(args.bundle)
+        print(f"Wrote {len(registry.keys())} prompts to {args.bundle}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,291 @@
+"""
+Adaptive sequential evaluation: score a task on test rows drawn in random order, keep a
+confidence interval of the metric up to date, and stop as soon as the interval is narrow
+enough or clearly above or below a reference score. Screening a candidate model this
+way often needs only a fraction of a large split (e.g. the CUAD and MAUD tasks).
+
+Generations are requested in batches through a callable, so only the rows that are
+actually scored need to be generated:
+
+    from sequential_evaluation import evaluate_sequential
+    report = evaluate_sequential(task, answers, lambda rows: [generate(prompts[i]) for i in rows],
+                                 reference=0.8)
+
+The CLI replays an existing results table, to see how many rows each task would have needed:
+
+    python sequential_evaluation.py --results results.jsonl --max_width 0.1 --reference 0.7 [--group_by model]
+
+The interval is a normal approximation with a finite-population correction, so it
+shrinks to the exact score when every row has been used. It is not adjusted for
+checking after every batch; use a higher confidence for stricter guarantees.
+
+For balanced accuracy, the rows are visited in turn from each gold label, so every class
+is sampled early, and a class that has not been sampled yet counts as maximally uncertain.
+"""
+
+import argparse
+import math
+import random
+from collections import Counter
+from itertools import chain, zip_longest
+from statistics import NormalDist
+from typing import Callable, Dict, List, Optional, Tuple
+
+from evaluation import (
+    BalancedAccuracyAccumulator,
+    F1Accumulator,
+    MANUAL_EVAL_TASKS,
+    get_accumulator,
+    normalize_batch,
+    read_results,
+)
+
+BATCH_SIZE = 32
+# Rows scored before the stopping rules are checked.
+MIN_ROWS = 50
+
+
+def stratified_order(labels: List[str], rng: random.Random) -> List[int]:
+    """
+    Returns the row indices in random order within each label, taking one row of each
+    label in turn until a label runs out.
+    """
+    rows: Dict[str, List[int]] = {}
+    for i, label in enumerate(labels):
+        rows.setdefault(label, []).append(i)
+    strata = list(rows.values())
+    rng.shuffle(strata)
+    for stratum in strata:
+        rng.shuffle(stratum)
+    return [i for i in chain.from_iterable(zip_longest(*strata)) if i is not None]
+
+
+class SequentialEvaluation:
+    """
+    Running score and confidence interval of a task over its rows, visited in a
+    random order fixed by seed (stratified by gold label for balanced accuracy).
+
+    Args:
+        task: the task name
+        answers: the gold answers of all rows
+        confidence: confidence level of the interval
+        seed: seed of the row order
+    """
+
+    def __init__(self, task: str, answers: List[str], confidence: float = 0.95, seed: int = 0):
+        if task in MANUAL_EVAL_TASKS:
+            raise ValueError(f"Task {task} is evaluated manually")
+        if not answers:
+            raise ValueError("No rows to evaluate")
+        self.task = task
+        self.num_rows = len(answers)
+        self.z = NormalDist().inv_cdf((1 + confidence) / 2)
+        self.accumulator = get_accumulator(task)
+        rng = random.Random(seed)
+        if isinstance(self.accumulator, BalancedAccuracyAccumulator):
+            labels = normalize_batch(answers, stem=False)
+            # rows of each normalized gold label, the classes of balanced accuracy
+            self.label_sizes = Counter(labels)
+            self.order = stratified_order(labels, rng)
+        else:
+            self.label_sizes = None
+            self.order = rng.sample(range(self.num_rows), self.num_rows)
+        self.rows_used = 0
+        # Sums over rows of a = 2tp, b = 2tp + fp + fn and their products, for the
+        # variance of micro-F1 = sum(a) / sum(b).
+        self._moments = [0.0] * 5
+
+    def next_rows(self, batch_size: int = BATCH_SIZE) -> List[int]:
+        """
+        Returns the indices of the next rows to score.
+        """
+        return self.order[self.rows_used : self.rows_used + batch_size]
+
+    def update(self, generations: List[str], answers: List[str]) -> "SequentialEvaluation":
+        """
+        Adds the generations of the rows returned by next_rows().
+        """
+        if len(generations) != len(answers):
+            raise ValueError(f"Got {len(generations)} generations but {len(answers)} answers")
+        if isinstance(self.accumulator, F1Accumulator):
+            for tp, fp, fn in self.accumulator.row_counts(generations, answers):
+                self.accumulator.add_counts(tp, fp, fn)
+                a, b = 2 * tp, 2 * tp + fp + fn
+                self._moments[0] += a
+                self._moments[1] += b
+                self._moments[2] += a * a
+                self._moments[3] += a * b
+                self._moments[4] += b * b
+        else:
+            self.accumulator.update(generations, answers)
+        self.rows_used += len(generations)
+        return self
+
+    def score(self) -> Optional[float]:
+        try:
+            return self.accumulator.result()
+        except (ValueError, ZeroDivisionError):
+            return None
+
+    def _variance(self) -> Optional[float]:
+        # Variance of the score, with the finite-population correction.
+        n, N = self.rows_used, self.num_rows
+        if isinstance(self.accumulator, BalancedAccuracyAccumulator):
+            totals: Dict[str, int] = {}
+            hits: Dict[str, int] = {}
+            for (answer, generation), count in self.accumulator.confusion.items():
+                totals[answer] = totals.get(answer, 0) + count
+                if answer == generation:
+                    hits[answer] = hits.get(answer, 0) + count
+            # mean of independent per-class recalls, each smoothed so that classes
+            # with all or no hits still contribute uncertainty, and each corrected for
+            # the rows left in its class; a class not sampled yet has variance 1/4, the
+            # largest a recall can have
+            variance = 0.0
+            for label, size in self.label_sizes.items():
+                total = totals.get(label, 0)
+                if total == 0:
+                    variance += 0.25
+                    continue
+                p = (hits.get(label, 0) + 1) / (total + 2)
+                correction = (size - total) / (size - 1) if size > 1 else 0.0
+                variance += p * (1 - p) / total * correction
+            return variance / len(self.label_sizes) ** 2
+        correction = (N - n) / (N - 1) if N > 1 else 0.0
+        if isinstance(self.accumulator, F1Accumulator):
+            sum_a, sum_b, sum_aa, sum_ab, sum_bb = self._moments
+            if sum_b == 0 or n < 2:
+                return None
+            # delta method for a ratio estimator
+            ratio = sum_a / sum_b
+            residuals = sum_aa - 2 * ratio * sum_ab + ratio * ratio * sum_bb
+            mean_b = sum_b / n
+            return max(residuals, 0.0) / (n - 1) / n / mean_b**2 * correction
+        p = (self.accumulator.correct + 1) / (self.accumulator.total + 2)
+        return p * (1 - p) / n * correction
+
+    def interval(self) -> Tuple[float, float]:
+        """
+        Returns the confidence interval of the score over all rows of the task.
+        """
+        score = self.score()
+        variance = self._variance() if self.rows_used else None
+        if score is None or variance is None:
+            return 0.0, 1.0
+        half_width = self.z * math.sqrt(variance)
+        return max(0.0, score - half_width), min(1.0, score + half_width)
+
+    def stop_reason(
+        self, max_width: Optional[float] = None, reference: Optional[float] = None, min_rows: int = MIN_ROWS
+    ) -> Optional[str]:
+        """
+        Returns why evaluation can stop, or None to continue.
+        """
+        if self.rows_used >= self.num_rows:
+            return "all rows used"
+        if self.rows_used < min(min_rows, self.num_rows):
+            return None
+        low, high = self.interval()
+        if reference is not None:
+            if low > reference:
+                return "above reference"
+            if high < reference:
+                return "below reference"
+        if max_width is not None and high - low <= max_width:
+            return "interval narrow enough"
+        return None
+
+
+def evaluate_sequential(
+    task: str,
+    answers: List[str],
+    generate: Callable[[List[int]], List[str]],
+    max_width: Optional[float] = 0.05,
+    reference: Optional[float] = None,
+    confidence: float = 0.95,
+    batch_size: int = BATCH_SIZE,
+    min_rows: int = MIN_ROWS,
+    seed: int = 0,
+) -> dict:
+    """
+    Evaluates a task on randomly ordered rows until the confidence interval of its score
+    is at most max_width wide, or excludes reference.
+
+    Args:
+        task: the task name
+        answers: the gold answers of all test rows
+        generate: returns the generations of the given row indices
+        max_width: stop once the interval is this narrow (None to only use reference)
+        reference: stop once the interval is entirely above or below this score
+        confidence: confidence level of the interval
+        batch_size: rows generated and scored at a time
+        min_rows: rows scored before stopping is considered
+        seed: seed of the row order (stratified by gold label for balanced accuracy)
+
+    Returns:
+        a report with the score, the interval, the number of rows used and the reason
+        for stopping
+    """
+    evaluation = SequentialEvaluation(task, answers, confidence, seed)
+    while True:
+        rows = evaluation.next_rows(batch_size)
+        generations = list(generate(rows))
+        evaluation.update(generations, [answers[i] for i in rows])
+        reason = evaluation.stop_reason(max_width, reference, min_rows)
+        if reason is not None:
+            break
+    low, high = evaluation.interval()
+    return {
+        "task": task,
+        "score": evaluation.score(),
+        "low": low,
+        "high": high,
+        "rows_used": evaluation.rows_used,
+        "num_rows": evaluation.num_rows,
+        "stopped": reason,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Sequential LegalBench evaluation with early stopping")
+    parser.add_argument("--results", type=str, required=True, help="Results table (.tsv, .csv or .jsonl) with task, generation and answer columns")
+    parser.add_argument("--group_by", type=str, nargs="*", default=[], help="Extra columns to evaluate separately, e.g. model")
+    parser.add_argument("--max_width", type=float, default=0.05, help="Stop once the confidence interval is this narrow")
+    parser.add_argument("--reference", type=float, help="Stop once the interval is entirely above or below this score")
+    parser.add_argument("--confidence", type=float, default=0.95, help="Confidence level of the interval")
+    parser.add_argument("--batch_size", type=int, default=BATCH_SIZE, help="Rows scored at a time")
+    parser.add_argument("--min_rows", type=int, default=MIN_ROWS, help="Rows scored before stopping is considered")
+    parser.add_argument("--seed", type=int, default=0, help="Seed of the row order")
+
+    args = parser.parse_args()
+
+    results = read_results(args.results)
+    total_used, total_rows = 0, 0
+    for key, task_df in results.groupby(args.group_by + ["task"], sort=True):
+        task = key[-1]
+        if task in MANUAL_EVAL_TASKS:
+            continue
+        generations = task_df["generation"].astype(str).tolist()
+        report = evaluate_sequential(
+            task,
+            task_df["answer"].astype(str).tolist(),
+            lambda rows: [generations[i] for i in rows],
+            args.max_width,
+            args.reference,
+            args.confidence,
+            args.batch_size,
+            args.min_rows,
+            args.seed,
+        )
+        total_used += report["rows_used"]
+        total_rows += report["num_rows"]
+        print(
+            "\t".join(map(str, key)) + f"\t{report['score']:.4f} [{report['low']:.4f}, {report['high']:.4f}]\t"
+            f"{report['rows_used']}/{report['num_rows']} rows\t{report['stopped']}"
+        )
+    if total_rows:
+        print(f"Used {total_used} of {total_rows} rows ({total_used / total_rows:.1%})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,142 @@
+"""
+Sharded evaluation: plan shards over LegalBench tasks, score each shard on its own
+machine, and merge the partial metric states into final per-task scores.
+
+Generations are read from JSONL files with one record per line:
+
+    {"task": "abercrombie", "generation": "generic", "answer": "generic"}
+
+Typical workflow:
+
+    python sharded_evaluation.py plan --num_shards 4 --output plan.json
+    python sharded_evaluation.py score --plan plan.json --shard 0 --generations gens_0.jsonl --output state_0.json
+    ...
+    python sharded_evaluation.py merge state_0.json state_1.json state_2.json state_3.json
+"""
+
+import argparse
+import json
+from typing import Dict, Iterable, List
+
+from evaluation import (
+    MANUAL_EVAL_TASKS,
+    accumulator_from_state,
+    get_accumulator,
+    merge_states,
+)
+from tasks import TASKS
+
+# Number of rows buffered per task before they are fed to the task's accumulator.
+CHUNK_SIZE = 1000
+
+
+def plan_shards(num_shards: int, tasks: List[str] = TASKS) -> List[List[str]]:
+    """
+    Splits the automatically scored tasks round-robin into num_shards shards.
+    """
+    if num_shards < 1:
+        raise ValueError("num_shards must be at least 1")
+    scored_tasks = [t for t in tasks if t not in MANUAL_EVAL_TASKS]
+    return [scored_tasks[i::num_shards] for i in range(num_shards)]
+
+
+def read_generations(path: str) -> Iterable[dict]:
+    with open(path) as in_file:
+        for line in in_file:
+            if line.strip():
+                yield json.loads(line)
+
+
+def score_shard(records: Iterable[dict], tasks: List[str] = None) -> Dict[str, dict]:
+    """
+    Scores a stream of generation records and returns the partial metric state of
+    every task seen. If tasks is given, records for other tasks are skipped.
+    """
+    accumulators = {}
+    buffers = {}
+    for record in records:
+        task = record["task"]
+        if tasks is not None and task not in tasks:
+            continue
+        if task not in accumulators:
+            accumulators[task] = get_accumulator(task)
+            buffers[task] = ([], [])
+        generations, answers = buffers[task]
+        generations.append(record["generation"])
+        answers.append(record["answer"])
+        if len(generations) >= CHUNK_SIZE:
+            accumulators[task].update(generations, answers)
+            buffers[task] = ([], [])
+    for task, (generations, answers) in buffers.items():
+        if generations:
+            accumulators[task].update(generations, answers)
+    return {task: accumulator.state() for task, accumulator in accumulators.items()}
+
+
+def merge_shards(shard_states: Iterable[Dict[str, dict]]) -> Dict[str, float]:
+    """
+    Merges per-task states from any number of shards (a task may appear in several)
+    and returns the final score for each task.
+    """
+    states_by_task = {}
+    for shard in shard_states:
+        for task, state in shard.items():
+            states_by_task.setdefault(task, []).append(state)
+    return {
+        task: accumulator_from_state(merge_states(states)).result()
+        for task, states in states_by_task.items()
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Sharded LegalBench evaluation")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    plan_parser = subparsers.add_parser("plan", help="Assign tasks to shards")
+    plan_parser.add_argument("--num_shards", type=int, required=True, help="Number of shards")
+    plan_parser.add_argument("--output", type=str, required=True, help="Path to write the plan to")
+
+    score_parser = subparsers.add_parser("score", help="Score generations into partial states")
+    score_parser.add_argument("--generations", type=str, nargs="+", required=True, help="JSONL generation files")
+    score_parser.add_argument("--output", type=str, required=True, help="Path to write the states to")
+    score_parser.add_argument("--plan", type=str, help="Plan file; restricts scoring to the tasks of --shard")
+    score_parser.add_argument("--shard", type=int, help="Shard index in the plan")
+
+    merge_parser = subparsers.add_parser("merge", help="Merge partial states into task scores")
+    merge_parser.add_argument("states", type=str, nargs="+", help="State files written by score")
+    merge_parser.add_argument("--output", type=str, help="Optional path to write the scores to as JSON")
+
+    args = parser.parse_args()
+
+    if args.command == "plan":
+        shards = plan_shards(args.num_shards)
+        with open(args.output, "w") as out_file:
+            json.dump({"num_shards": args.num_shards, "shards": shards}, out_file, indent=2)
+
+    elif args.command == "score":
+        tasks = None
+        if args.plan is not None:
+            if args.shard is None:
+                parser.error("--shard is required with --plan")
+            with open(args.plan) as in_file:
+                tasks = set(json.load(in_file)["shards"][args.shard])
+        records = (r for path in args.generations for r in read_generations(path))
+        states = score_shard(records, tasks)
+        with open(args.output, "w") as out_file:
+            json.dump({"shard": args.shard, "states": states}, out_file)
+
+    elif args.command == "merge":
+        shard_states = []
+        for path in args.states:
+            with open(path) as in_file:
+                shard_states.append(json.load(in_file)["states"])
+        scores = merge_shards(shard_states)
+        for task in sorted(scores):
+            print(f"{task}\t{scores[task]}")
+        if args.output is not None:
+            with open(args.output, "w") as out_file:
+                json.dump(scores, out_file, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,217 @@
+"""
+Precomputed catalog of LegalBench task metadata.
+
+The catalog is a JSON manifest (task_catalog.json) generated from the task folders, so
+that selecting tasks (e.g. by license or reasoning category) doesn't require loading
+every dataset. Regenerate it after changing task data or prompts with:
+
+    python task_catalog.py --output task_catalog.json [--from_hub]
+"""
+
+import argparse
+import json
+import os
+import re
+from collections import defaultdict
+from functools import lru_cache
+from typing import Dict, List, Optional
+
+from evaluation import (
+    EXACT_MATCH_BALANCED_ACC_TASKS,
+    MANUAL_EVAL_TASKS,
+)
+from tasks import TASKS, TASK_CATEGORIES
+
+# Bump when the layout of catalog entries changes.
+CATALOG_VERSION = 1
+CATALOG_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "task_catalog.json")
+TASKS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "tasks")
+HUGGINGFACE_DATASET = "nguha/legalbench"
+
+# Fields that tasks_where() can filter on.
+QUERY_FIELDS = ["license", "category", "metric"]
+
+
+def metric_family(task: str) -> str:
+    """
+    Returns the family of the metric evaluation.evaluate uses for task.
+    """
+    if task in EXACT_MATCH_BALANCED_ACC_TASKS:
+        return "balanced_accuracy"
+    elif task == "successor_liability" or task.startswith("ssla"):
+        return "f1"
+    elif task in ["sara_numeric", "citation_prediction_open", "definition_extraction"]:
+        return "accuracy"
+    elif task in MANUAL_EVAL_TASKS:
+        return "manual"
+    else:
+        raise ValueError(f"Unknown task: {task}")
+
+
+def _read_readme_license(task_dir: str) -> Optional[str]:
+    for name in ["README.md", "README.MD"]:
+        path = os.path.join(task_dir, name)
+        if os.path.exists(path):
+            with open(path) as in_file:
+                match = re.search(r"\*\*License\*\*:\s*(.+)", in_file.read())
+            if match is None:
+                return None
+            license = match.group(1).strip()
+            # "[CC BY 4.0](https://...)" -> "CC BY 4.0"
+            link = re.match(r"\[(.+?)\]\(.*\)", license)
+            if link is not None:
+                license = link.group(1)
+            # READMEs spell Creative Commons licenses inconsistently ("CC by 4.0").
+            if license.upper().startswith("CC "):
+                license = license.upper()
+            return license
+    return None
+
+
+def _dataset_version() -> Optional[str]:
+    # The most recent entry of the data changelog.
+    changelog = os.path.join(os.path.dirname(TASKS_DIR), "CHANGELOG.md")
+    if not os.path.exists(changelog):
+        return None
+    with open(changelog) as in_file:
+        match = re.search(r"^## (.+)$", in_file.read(), re.MULTILINE)
+    return match.group(1).strip() if match else None
+
+
+def build_catalog(from_hub: bool = False) -> dict:
+    """
+    Builds the catalog from the task folders. Test split sizes are only known to the
+    Hugging Face dataset, so they are filled in (along with the Hub's license string)
+    only when from_hub is set.
+    """
+    import pandas as pd
+
+    categories = {t: c for c, category_tasks in TASK_CATEGORIES.items() for t in category_tasks}
+    entries = {}
+    for task in TASKS:
+        task_dir = os.path.join(TASKS_DIR, task)
+        train_path = os.path.join(task_dir, "train.tsv")
+        if os.path.exists(train_path):
+            train_df = pd.read_csv(train_path, sep="\t", dtype=str, keep_default_na=False)
+            columns = list(train_df.columns)
+            train_size = len(train_df)
+        else:
+            train_df, columns, train_size = None, None, 0
+        input_columns = None
+        if columns is not None:
+            input_columns = [c for c in columns if c not in ("answer", "index")]
+
+        metric = metric_family(task)
+        labels = None
+        if metric == "balanced_accuracy" and train_df is not None:
+            labels = sorted(set(train_df["answer"]))
+
+        entries[task] = {
+            "license": _read_readme_license(task_dir),
+            "category": categories.get(task),
+            "metric": metric,
+            "columns": columns,
+            "input_columns": input_columns,
+            # Labels seen in the train split; only for classification tasks.
+            "answer_labels": labels,
+            "train_size": train_size,
+            "test_size": None,
+            "prompts": sorted(
+                name[: -len(".txt")]
+                for name in os.listdir(task_dir)
+                if name.endswith(".txt") and "prompt" in name
+            ),
+        }
+
+    if from_hub:
+        from datasets import load_dataset_builder
+
+        for task, entry in entries.items():
+            info = load_dataset_builder(HUGGINGFACE_DATASET, task).info
+            entry["license"] = info.license or entry["license"]
+            if info.splits is not None:
+                for split in ["train", "test"]:
+                    if split in info.splits:
+                        entry[f"{split}_size"] = info.splits[split].num_examples
+
+    return {
+        "version": CATALOG_VERSION,
+        "dataset_version": _dataset_version(),
+        "tasks": entries,
+    }
+
+
+@lru_cache(maxsize=None)
+def load_catalog(path: str = CATALOG_PATH) -> Dict[str, dict]:
+    """
+    Loads the catalog manifest (once per process) and returns its entries keyed by task.
+    """
+    with open(path) as in_file:
+        catalog = json.load(in_file)
+    if catalog.get("version") != CATALOG_VERSION:
+        raise ValueError(
+            f"Task catalog {path} has version {catalog.get('version')}, expected "
+            f"{CATALOG_VERSION}; regenerate it with `python task_catalog.py`"
+        )
+    return catalog["tasks"]
+
+
+@lru_cache(maxsize=None)
+def _index(path: str = CATALOG_PATH) -> Dict[str, Dict[str, List[str]]]:
+    # field -> value -> tasks (in TASKS order)
+    index = {field: defaultdict(list) for field in QUERY_FIELDS}
+    for task, entry in load_catalog(path).items():
+        for field in QUERY_FIELDS:
+            index[field][entry[field]].append(task)
+    return index
+
+
+def get_task_info(task: str) -> dict:
+    """
+    Returns the catalog entry of task.
+    """
+    catalog = load_catalog()
+    if task not in catalog:
+        raise ValueError(f"Unknown task: {task}")
+    return catalog[task]
+
+
+def tasks_where(**criteria) -> List[str]:
+    """
+    Returns the tasks matching all criteria, in TASKS order.
+
+    Supported criteria are license, category and metric, e.g.
+    tasks_where(license="CC BY 4.0", category="issue"). A criterion can also be a list
+    of accepted values.
+    """
+    unknown = set(criteria) - set(QUERY_FIELDS)
+    if unknown:
+        raise ValueError(f"Unsupported criteria {sorted(unknown)}, expected {QUERY_FIELDS}")
+
+    index = _index()
+    selected = None
+    for field, values in criteria.items():
+        if not isinstance(values, (list, tuple, set)):
+            values = [values]
+        matching = {t for value in values for t in index[field].get(value, [])}
+        selected = matching if selected is None else selected & matching
+    if selected is None:
+        return list(load_catalog())
+    return [t for t in load_catalog() if t in selected]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate the LegalBench task catalog")
+    parser.add_argument("--output", type=str, default=CATALOG_PATH, help="Path to write the catalog to")
+    parser.add_argument("--from_hub", action="store_true", help="Fill in test sizes and licenses from the Hugging Face dataset")
+
+    args = parser.parse_args()
+
+    catalog = build_catalog(from_hub=args.from_hub)
+    with open(args.output, "w") as out_file:
+        json.dump(catalog, out_file, indent=1)
+        out_file.write("\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,140 @@
+"""
+Offline columnar store of LegalBench task splits.
+
+The build step packs every (task, split) into an uncompressed Arrow IPC file, which the
+loaders memory-map so that columns are read without parsing or copying. Train splits are
+read from tasks/<task>/train.tsv; test splits come from the Hugging Face dataset, so
+building them needs network access once:
+
+    python task_store.py --store_dir task_store --splits train test --from_hub
+
+Afterwards, e.g. on a machine without network access:
+
+    from task_store import load_column
+    answers = load_column("abercrombie", "test", "answer")
+"""
+
+import argparse
+import json
+import os
+from functools import lru_cache
+from typing import Dict, List
+
+from tasks import TASKS
+
+STORE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "task_store")
+TASKS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "tasks")
+HUGGINGFACE_DATASET = "nguha/legalbench"
+MANIFEST_NAME = "manifest.json"
+
+
+def _read_split(task: str, split: str, from_hub: bool):
+    import pyarrow as pa
+
+    path = os.path.join(TASKS_DIR, task, f"{split}.tsv")
+    if os.path.exists(path):
+        import pandas as pd
+
+        df = pd.read_csv(path, sep="\t", dtype=str, keep_default_na=False)
+        return pa.Table.from_pandas(df, preserve_index=False)
+    if from_hub:
+        from datasets import load_dataset
+
+        return load_dataset(HUGGINGFACE_DATASET, task, split=split).data.table
+    return None
+
+
+def build_store(
+    store_dir: str = STORE_DIR,
+    tasks: List[str] = TASKS,
+    splits: List[str] = ("train", "test"),
+    from_hub: bool = False,
+) -> Dict[str, Dict[str, dict]]:
+    """
+    Writes one Arrow file per (task, split) to store_dir, plus a manifest of their row
+    counts and columns. All columns are stored as strings, matching the TSV files.
+    Splits without a local TSV are skipped unless from_hub is set. Entries of an
+    existing store that are not rebuilt are kept.
+
+    Returns: the manifest, task -> split -> {"num_rows", "columns"}
+    """
+    import pyarrow as pa
+
+    manifest: Dict[str, Dict[str, dict]] = {}
+    manifest_path = os.path.join(store_dir, MANIFEST_NAME)
+    if os.path.exists(manifest_path):
+        with open(manifest_path) as in_file:
+            manifest = json.load(in_file)
+    for task in tasks:
+        for split in splits:
+            table = _read_split(task, split, from_hub)
+            if table is None:
+                continue
+            table = table.cast(pa.schema([(name, pa.string()) for name in table.column_names]))
+            os.makedirs(os.path.join(store_dir, task), exist_ok=True)
+            with pa.OSFile(os.path.join(store_dir, task, f"{split}.arrow"), "wb") as sink:
+                with pa.ipc.new_file(sink, table.schema) as writer:
+                    writer.write_table(table)
+            manifest.setdefault(task, {})[split] = {
+                "num_rows": table.num_rows,
+                "columns": table.column_names,
+            }
+
+    os.makedirs(store_dir, exist_ok=True)
+    with open(manifest_path, "w") as out_file:
+        json.dump(manifest, out_file, indent=1)
+    return manifest
+
+
+@lru_cache(maxsize=None)
+def load_manifest(store_dir: str = STORE_DIR) -> Dict[str, Dict[str, dict]]:
+    """
+    Returns the manifest written by build_store.
+    """
+    with open(os.path.join(store_dir, MANIFEST_NAME)) as in_file:
+        return json.load(in_file)
+
+
+@lru_cache(maxsize=None)
+def load_table(task: str, split: str, store_dir: str = STORE_DIR):
+    """
+    Returns the pyarrow.Table of a task split, memory-mapped from the store (no copy).
+    """
+    import pyarrow as pa
+
+    if split not in load_manifest(store_dir).get(task, {}):
+        raise ValueError(f"{task}/{split} is not in the task store at {store_dir}")
+    source = pa.memory_map(os.path.join(store_dir, task, f"{split}.arrow"), "r")
+    return pa.ipc.open_file(source).read_all()
+
+
+def load_column(task: str, split: str, column: str, store_dir: str = STORE_DIR):
+    """
+    Returns one column of a task split as a zero-copy pyarrow.ChunkedArray view.
+    """
+    return load_table(task, split, store_dir).column(column)
+
+
+def load_dataframe(task: str, split: str, store_dir: str = STORE_DIR):
+    """
+    Returns a task split as a pandas dataframe. Unlike the column views, this copies.
+    """
+    return load_table(task, split, store_dir).to_pandas()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build the offline LegalBench task store")
+    parser.add_argument("--store_dir", type=str, default=STORE_DIR, help="Directory to write the store to")
+    parser.add_argument("--splits", type=str, nargs="+", default=["train", "test"], help="Splits to store")
+    parser.add_argument("--tasks", type=str, nargs="*", default=TASKS, help="Tasks to store (defaults to all)")
+    parser.add_argument("--from_hub", action="store_true", help="Load splits without a local TSV from Hugging Face")
+
+    args = parser.parse_args()
+
+    manifest = build_store(args.store_dir, args.tasks, args.splits, args.from_hub)
+    num_splits = sum(len(splits) for splits in manifest.values())
+    print(f"Stored {num_splits} splits of {len(manifest)} tasks in {args.store_dir}")
+
+
+if __name__ == "__main__":
+    main()
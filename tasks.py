@@ -341,4 +341,12 @@ RHETORIC_TASKS = [
     "scalr",
     "textualism_tool_dictionaries",
     "textualism_tool_plain",
-]
\ No newline at end of file
+]
+# Reasoning category of each task list above, keyed by category name.
+TASK_CATEGORIES = {
+    "issue": ISSUE_TASKS,
+    "rule": RULE_TASKS,
+    "conclusion": CONCLUSION_TASKS,
+    "interpretation": INTERPRETATION_TASKS,
+    "rhetoric": RHETORIC_TASKS,
+}
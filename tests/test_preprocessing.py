@@ -0,0 +1,49 @@
+import dataclasses
+from collections import namedtuple
+
+from weave.trace.serialization.serialize import to_json
+
+from leaderboard.organizer_setup.utils.preprocessing import RowView, preprocess_example, view_example
+
+NamedRow = namedtuple("NamedRow", ["text", "answer"])
+
+
+@dataclasses.dataclass
+class DataclassRow:
+    text: str
+    answer: str
+
+
+class ObjectRow:
+    def __init__(self, text, answer):
+        self.text = text
+        self.answer = answer
+
+
+ROWS = [
+    {"text": "The mark is descriptive.", "answer": "Yes"},
+    NamedRow("The mark is descriptive.", "Yes"),
+    DataclassRow("The mark is descriptive.", "Yes"),
+    ObjectRow("The mark is descriptive.", "Yes"),
+]
+EXPECTED = {
+    "data": {"text": "The mark is descriptive.", "answer": "Yes"},
+    "text": "The mark is descriptive.",
+    "answer": "Yes",
+}
+
+
+def test_view_example_reads_row_fields():
+    for row in ROWS:
+        result = view_example(row)
+        assert isinstance(result["data"], RowView)
+        assert dict(result["data"]) == EXPECTED["data"]
+        assert result["text"] == EXPECTED["text"]
+
+
+def test_row_view_serializes_as_dict_in_traces():
+    # the same serialization weave applies to op inputs and outputs when logging a call
+    for row in ROWS:
+        output = preprocess_example(row)
+        assert to_json(output, "entity/project", None, use_dictify=False) == EXPECTED
+        assert to_json(output, "entity/project", None, use_dictify=True) == EXPECTED
@@ -1,5 +1,84 @@
+import re
+import hashlib
+from functools import lru_cache
 import pandas as pd
-from typing import List
+from typing import Dict, Iterable, Iterator, List, Tuple, Union
+
+# A {{field}} placeholder. Field names cannot contain braces, so "{{{text}}}" is a literal
+# brace around the {{text}} field.
+FIELD_PATTERN = re.compile(r"\{\{([^{}]+)\}\}")
+
+
+class PromptTemplate:
+    """
+    A prompt template parsed once into literal text and {{field}} placeholders.
+    """
+
+    def __init__(self, template: str):
+        parts = FIELD_PATTERN.split(template)
+        # Literals and fields alternate: literal, field, literal, ..., literal.
+        self.literals: List[str] = parts[0::2]
+        self.fields: List[str] = parts[1::2]
+        assert self.fields, f"Prompt template has no fields to fill, {template}"
+        for literal in self.literals:
+            if "{{" in literal:
+                raise ValueError(f"Malformed placeholder in prompt template: {literal}")
+
+    def validate(self, columns) -> None:
+        """
+        Raises a ValueError if the template uses a field that is not in columns.
+        """
+        missing = sorted(set(self.fields) - set(columns))
+        if missing:
+            raise ValueError(f"Prompt template fields missing from data: {missing}")
+
+    def render(self, data: Dict) -> str:
+        """
+        Fills the template with the values of a single row.
+        """
+        self.validate(data.keys())
+        return self._join([str(data[field]) for field in self.fields])
+
+    def render_parts(self, data: Dict) -> Tuple[str, str]:
+        """
+        Fills the template with the values of a single row, split into the literal text
+        before the first field and the rest. The first part is the same string object
+        for every row, so a long few-shot prefix is held once however many prompts share it.
+        """
+        self.validate(data.keys())
+        pieces = []
+        for field, literal in zip(self.fields, self.literals[1:]):
+            pieces.append(str(data[field]))
+            pieces.append(literal)
+        return self.literals[0], "".join(pieces)
+
+    def render_df(self, data_df: pd.DataFrame) -> List[str]:
+        """
+        Fills the template for every row of data_df. Only the columns used by the
+        template are read, and each prompt is built with a single join.
+        """
+        self.validate(data_df.columns)
+        columns = {
+            field: [str(v) for v in data_df[field].tolist()]
+            for field in dict.fromkeys(self.fields)
+        }
+        field_columns = [columns[field] for field in self.fields]
+        return [self._join(values) for values in zip(*field_columns)]
+
+    def _join(self, values: List[str]) -> str:
+        pieces = [self.literals[0]]
+        for value, literal in zip(values, self.literals[1:]):
+            pieces.append(value)
+            pieces.append(literal)
+        return "".join(pieces)
+
+
+@lru_cache(maxsize=None)
+def compile_template(prompt_template: str) -> PromptTemplate:
+    """
+    Returns the parsed PromptTemplate for prompt_template, parsing each template only once.
+    """
+    return PromptTemplate(prompt_template)
 
 
 def generate_prompts(prompt_template: str, data_df: pd.DataFrame) -> List[str]:
@@ -9,21 +88,91 @@ def generate_prompts(prompt_template: str, data_df: pd.DataFrame) -> List[str]:
     Args:
         prompt_template: a prompt template
         data_df: pandas dataframe of samples to generate prompts for
-    
+
     Returns:
         prompts: a list of prompts corresponding to the rows of data_df
     """
+    return list(iter_prompts(prompt_template, data_df))
+
+
+def prompt_digest(prompt: str) -> bytes:
+    """
+    Compact fingerprint used to detect duplicated prompts without keeping them in memory.
+    """
+    return hashlib.blake2b(prompt.encode("utf-8"), digest_size=16).digest()
+
+
+def _iter_chunks(
+    data: Union[pd.DataFrame, str, Iterable[pd.DataFrame]], chunksize: int
+) -> Iterator[pd.DataFrame]:
+    if isinstance(data, pd.DataFrame):
+        for start in range(0, len(data), chunksize):
+            yield data.iloc[start : start + chunksize]
+    elif isinstance(data, str):
+        yield from pd.read_csv(data, sep="\t", chunksize=chunksize)
+    else:
+        yield from data
+
+
+def _iter_prompts_with_duplicates(
+    prompt_template: str,
+    data: Union[pd.DataFrame, str, Iterable[pd.DataFrame]],
+    chunksize: int,
+) -> Iterator[Tuple[str, int]]:
+    # Yields (prompt, row of the first identical prompt), which is the row itself when
+    # the prompt has not been seen before.
+    template = compile_template(prompt_template)
+    first_rows: Dict[bytes, int] = {}
+    row = 0
+    for chunk in _iter_chunks(data, chunksize):
+        for prompt in template.render_df(chunk):
+            yield prompt, first_rows.setdefault(prompt_digest(prompt), row)
+            row += 1
+
+
+def iter_prompts(
+    prompt_template: str,
+    data: Union[pd.DataFrame, str, Iterable[pd.DataFrame]],
+    chunksize: int = 1000,
+) -> Iterator[str]:
+    """
+    Lazily generates prompts for the rows of data using the template prompt_template.
+
+    Args:
+        prompt_template: a prompt template
+        data: a pandas dataframe, the path to a TSV file, or an iterable of dataframe
+            chunks (e.g. pd.read_csv(..., chunksize=...))
+        chunksize: number of rows rendered at a time
+
+    Returns:
+        an iterator over the prompts corresponding to the rows of data. Raises an
+        AssertionError naming both rows when a prompt duplicates an earlier one.
+    """
     assert (
         "{{" in prompt_template
     ), f"Prompt template has no fields to fill, {prompt_template}"
 
-    prompts = []
-    dicts = data_df.to_dict(orient="records")
-    for dd in dicts:
-        prompt = str(prompt_template)
-        for k, v in dd.items():
-            prompt = prompt.replace("{{" + k + "}}", str(v))
-        assert not "{{" in prompt, print(prompt)
-        prompts.append(prompt)
-    assert len(set(prompts)) == len(prompts), "Duplicated prompts detected"
-    return prompts
\ No newline at end of file
+    for row, (prompt, first_row) in enumerate(
+        _iter_prompts_with_duplicates(prompt_template, data, chunksize)
+    ):
+        assert (
+            first_row == row
+        ), f"Duplicated prompts detected: row {row} duplicates row {first_row}"
+        yield prompt
+
+
+def find_duplicate_prompts(
+    prompt_template: str,
+    data: Union[pd.DataFrame, str, Iterable[pd.DataFrame]],
+    chunksize: int = 1000,
+) -> List[Tuple[int, int]]:
+    """
+    Returns (row, earlier_row) pairs for every row whose prompt duplicates an earlier one.
+    """
+    return [
+        (row, first_row)
+        for row, (_, first_row) in enumerate(
+            _iter_prompts_with_duplicates(prompt_template, data, chunksize)
+        )
+        if first_row != row
+    ]